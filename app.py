@@ -1,211 +1,477 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel, HttpUrl
-from typing import List, Dict, Optional
-import asyncio
-from main import WebScrapingOrchestrator
-
-app = FastAPI(
-    title="Advanced Web Scraper for LLM",
-    description="Scrape, analyze, and store web content optimized for LLM consumption",
-    version="1.0.0"
-)
-
-# Global orchestrator instance
-orchestrator = WebScrapingOrchestrator()
-
-# Pydantic models
-class URLRequest(BaseModel):
-    url: HttpUrl
-    
-class SearchRequest(BaseModel):
-    query: str
-    limit: int = 5
-
-class BatchURLRequest(BaseModel):
-    urls: List[HttpUrl]
-
-# Response models
-class ScrapingResponse(BaseModel):
-    success: bool
-    url: str
-    title: Optional[str] = None
-    summary: Optional[Dict] = None
-    llm_ready_data: Optional[Dict] = None
-    error: Optional[str] = None
-
-class SearchResponse(BaseModel):
-    results: List[Dict]
-    total_found: int
-
-@app.post("/scrape", response_model=ScrapingResponse)
-async def scrape_url(request: URLRequest):
-    """Scrape a single URL and store data optimized for LLM consumption"""
-    try:
-        result = await orchestrator.process_url(str(request.url))
-        
-        if "error" in result:
-            raise HTTPException(status_code=400, detail=result["error"])
-        
-        return ScrapingResponse(**result)
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
-
-@app.post("/scrape-batch")
-async def scrape_batch_urls(request: BatchURLRequest, background_tasks: BackgroundTasks):
-    """Scrape multiple URLs in the background"""
-    async def process_batch():
-        results = []
-        for url in request.urls:
-            try:
-                result = await orchestrator.process_url(str(url))
-                results.append(result)
-            except Exception as e:
-                results.append({"error": str(e), "url": str(url)})
-        return results
-    
-    # Add to background tasks
-    background_tasks.add_task(process_batch)
-    
-    return {
-        "message": f"Started processing {len(request.urls)} URLs in background",
-        "urls": [str(url) for url in request.urls]
-    }
-
-@app.get("/page/{url:path}")
-async def get_page_data(url: str):
-    """Get processed page data optimized for LLM consumption"""
-    try:
-        # Decode URL
-        import urllib.parse
-        decoded_url = urllib.parse.unquote(url)
-        
-        page_data = orchestrator.get_page_for_llm(decoded_url)
-        
-        if not page_data:
-            raise HTTPException(status_code=404, detail="Page not found")
-        
-        return page_data
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
-
-@app.post("/search", response_model=SearchResponse)
-async def search_content(request: SearchRequest):
-    """Search stored content for LLM context"""
-    try:
-        results = orchestrator.search_for_llm(request.query, request.limit)
-        
-        return SearchResponse(
-            results=results,
-            total_found=len(results)
-        )
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
-
-@app.get("/llm-ready/{url:path}")
-async def get_llm_ready_content(url: str):
-    """Get content specifically formatted for LLM consumption"""
-    try:
-        import urllib.parse
-        decoded_url = urllib.parse.unquote(url)
-        
-        page_data = orchestrator.get_page_for_llm(decoded_url)
-        
-        if not page_data:
-            raise HTTPException(status_code=404, detail="Page not found")
-        
-        # Format for LLM
-        llm_content = {
-            "instruction": "Use this content for generating summaries, notes, or mind maps",
-            "content": {
-                "title": page_data["title"],
-                "main_content": page_data["content"],
-                "structure": {
-                    "headings": page_data["headings"],
-                    "content_type": page_data["study_metadata"]["content_type"],
-                    "complexity": page_data["study_metadata"]["complexity_score"],
-                    "reading_time": page_data["study_metadata"]["reading_time"]
-                },
-                "context": {
-                    "related_pages": page_data["relationships"]["related_pages"],
-                    "key_topics": page_data["study_metadata"]["key_topics"]
-                }
-            },
-            "suggestions": {
-                "study_approach": _get_study_approach(page_data["study_metadata"]),
-                "focus_areas": page_data["headings"][:3],
-                "difficulty_level": _assess_difficulty(page_data["study_metadata"])
-            }
-        }
-        
-        return llm_content
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"LLM formatting failed: {str(e)}")
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "message": "Web scraper API is running"}
-
-@app.get("/stats")
-async def get_statistics():
-    """Get scraping statistics"""
-    try:
-        # Get basic stats from MongoDB
-        mongo_stats = orchestrator.mongo_storage.collection.estimated_document_count()
-        
-        return {
-            "total_pages_scraped": mongo_stats,
-            "database_status": "connected",
-            "features": [
-                "Dynamic content scraping with Playwright",
-                "DOM structure analysis",
-                "MongoDB storage for content",
-                "Neo4j for relationships",
-                "LLM-optimized data extraction"
-            ]
-        }
-    
-    except Exception as e:
-        return {"error": f"Stats retrieval failed: {str(e)}"}
-
-def _get_study_approach(metadata: Dict) -> str:
-    """Suggest study approach based on content analysis"""
-    content_type = metadata.get("content_type", "general")
-    complexity = metadata.get("complexity_score", 0)
-    
-    if content_type == "tutorial":
-        return "hands-on practice with step-by-step approach"
-    elif content_type == "documentation":
-        return "reference-based learning with examples"
-    elif content_type == "research":
-        return "analytical reading with note-taking"
-    elif complexity > 5:
-        return "detailed study with concept mapping"
-    else:
-        return "general reading with summary creation"
-
-def _assess_difficulty(metadata: Dict) -> str:
-    """Assess content difficulty for LLM processing hints"""
-    complexity = metadata.get("complexity_score", 0)
-    reading_time = metadata.get("reading_time", 0)
-    
-    if complexity < 2 and reading_time < 5:
-        return "beginner"
-    elif complexity < 5 and reading_time < 15:
-        return "intermediate"
-    else:
-        return "advanced"
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Clean up on shutdown"""
-    orchestrator.close_connections()
-
-# Run the API
-if __name__ == "__main__":
-    import uvicorn
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Header
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Dict, Optional, Set
+import asyncio
+import threading
+import time
+from main import WebScrapingOrchestrator, LLM_PAGE_FIELDS, SEARCH_RESULT_FIELDS
+from responses import FastJSONResponse, CompressionMiddleware, parse_fields
+from jobs import JobRegistry, Job, stream_job_events
+from worker.queue import open_queue, TERMINAL_STATES
+from crawler.recrawl import RecrawlScheduler
+from crawler.sitemaps import SitemapReader, parse_lastmod
+from crawler.frontier import Frontier
+from config.settings import settings
+from storage.export import export_query, iter_ndjson
+from storage.mongo_storage import EXPORT_PROJECTION
+
+app = FastAPI(
+    title="Advanced Web Scraper for LLM",
+    description="Scrape, analyze, and store web content optimized for LLM consumption",
+    version="1.0.0",
+    default_response_class=FastJSONResponse
+)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Global orchestrator instance
+orchestrator = WebScrapingOrchestrator()
+jobs = JobRegistry()
+job_queue = open_queue(getattr(settings.scraping, "job_queue_url", "sqlite:///data/jobs.db"))
+index_follower: Optional[asyncio.Task] = None
+recrawl_task: Optional[asyncio.Task] = None
+discovery_tasks: Set[asyncio.Task] = set()
+robots = orchestrator.robots
+
+# /llm-ready sections -> the get_page_for_llm fields each is built from
+LLM_READY_FIELDS = {
+    "title": {"title"},
+    "main_content": {"content"},
+    "tokens_used": {"tokens_used"},
+    "structure": {"headings", "study_metadata"},
+    "context": {"relationships", "study_metadata"},
+    "suggestions": {"headings", "study_metadata"},
+}
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Pydantic models
+class URLRequest(BaseModel):
+    url: HttpUrl
+    
+class SearchRequest(BaseModel):
+    query: str
+    limit: int = Field(5, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+    token_budget: Optional[int] = Field(None, ge=1)
+    include_relationships: bool = False
+
+class SemanticSearchRequest(BaseModel):
+    query: str
+    k: int = Field(10, ge=1, le=100)
+    token_budget: Optional[int] = Field(None, ge=1)
+
+class BatchURLRequest(BaseModel):
+    urls: List[HttpUrl]
+
+class DiscoverRequest(BaseModel):
+    site: HttpUrl
+    since: Optional[str] = None
+    limit: int = Field(0, ge=0)
+
+# Response models
+class ScrapingResponse(BaseModel):
+    success: bool
+    url: str
+    title: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    summary: Optional[Dict] = None
+    llm_ready_data: Optional[Dict] = None
+    error: Optional[str] = None
+
+class SearchResponse(BaseModel):
+    results: List[Dict]
+    total_found: int
+
+class SemanticSearchResponse(BaseModel):
+    results: List[Dict]
+    took_ms: float
+
+class DomainPagesResponse(BaseModel):
+    domain: str
+    pages: List[Dict]
+    next_after: Optional[str] = None
+
+@app.post("/scrape", response_model=ScrapingResponse)
+async def scrape_url(request: URLRequest):
+    """Scrape a single URL and store data optimized for LLM consumption"""
+    try:
+        result = await orchestrator.process_url(str(request.url))
+        
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        
+        return ScrapingResponse(**result)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+@app.post("/scrape/stream")
+async def scrape_url_stream(request: URLRequest):
+    """Scrape a single URL, streaming each pipeline stage as a Server-Sent Event"""
+    url = str(request.url)
+    job = jobs.create("scrape", [url])
+    job.task = asyncio.create_task(_run_scrape_job(job, url))
+    
+    return StreamingResponse(
+        stream_job_events(job),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Job-Id": job.id}
+    )
+
+@app.post("/scrape-batch")
+async def scrape_batch_urls(request: BatchURLRequest, background_tasks: BackgroundTasks):
+    """Queue URLs for the worker processes; follow progress at /jobs/{job_id}/events"""
+    urls = [str(url) for url in request.urls]
+    batch_id = await asyncio.to_thread(job_queue.enqueue, urls)
+    job = jobs.create("batch", urls, job_id=batch_id)
+    
+    # Relay worker progress to the job's event stream
+    background_tasks.add_task(_follow_batch_job, job)
+    
+    return {
+        "message": f"Queued {len(urls)} URLs for workers",
+        "urls": urls,
+        "job_id": job.id,
+        "events": f"/jobs/{job.id}/events"
+    }
+
+@app.post("/discover")
+async def discover_site(request: DiscoverRequest):
+    """Queue a whole site from its sitemaps, newest lastmod first; workers apply Crawl-delay"""
+    if request.since and parse_lastmod(request.since) is None:
+        raise HTTPException(status_code=400, detail=f"Invalid since date: {request.since}")
+    site = str(request.site)
+    sitemaps = await asyncio.to_thread(robots.sitemaps, site)
+    
+    task = asyncio.create_task(_discover_site(site, request.since, request.limit))
+    discovery_tasks.add(task)
+    task.add_done_callback(discovery_tasks.discard)
+    return {"message": f"Reading sitemaps for {site}", "sitemaps": sitemaps}
+
+async def _discover_site(site: str, since: Optional[str], limit: int):
+    """Read the sitemaps in a thread, then enqueue the whole frontier at once"""
+    stop = threading.Event()
+    
+    def collect() -> Frontier:
+        reader = SitemapReader(robots)
+        frontier = Frontier()
+        try:
+            for url, lastmod in reader.iter_urls(site, since=parse_lastmod(since)):
+                if stop.is_set():
+                    break
+                frontier.add(url, lastmod)
+                if limit and len(frontier) >= limit:
+                    break
+        finally:
+            reader.close()
+        return frontier
+    
+    try:
+        frontier = await asyncio.to_thread(collect)
+        print(f"✓ {site}: {len(frontier)} URLs from sitemaps")
+        await asyncio.to_thread(frontier.drain, job_queue)
+    except asyncio.CancelledError:
+        # The reading thread stops at its next URL
+        stop.set()
+        raise
+    except Exception as e:
+        print(f"✗ Discovery failed for {site}: {str(e)}")
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id: Optional[int] = Header(None)):
+    """Stream a job's stage events as SSE, replaying from Last-Event-ID on reconnect"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    after = last_event_id if last_event_id is not None else -1
+    return StreamingResponse(stream_job_events(job, after), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def _run_scrape_job(job: Job, url: str):
+    try:
+        async for event in orchestrator.process_url_stages(url):
+            job.publish(event)
+    finally:
+        job.finish()
+
+async def _follow_batch_job(job: Job, interval: float = 1.0):
+    """Relay workers' stage events and every job state change, until all are finished"""
+    seen: Dict[str, tuple] = {}
+    cursor = "0"
+    try:
+        while True:
+            # Statuses first: workers publish a job's events before finishing it,
+            # so events read afterwards include all of a finished job's
+            statuses = await asyncio.to_thread(job_queue.batch_status, job.id)
+            while True:
+                cursor, events = await asyncio.to_thread(job_queue.events_since, job.id, cursor)
+                if not events:
+                    break
+                for event in events:
+                    job.publish(event)
+            for status in statuses:
+                key = (status["state"], status["attempts"])
+                if seen.get(status["id"]) != key:
+                    seen[status["id"]] = key
+                    job.publish({"stage": status["state"], "url": status["url"], "data": status})
+            if all(status["state"] in TERMINAL_STATES for status in statuses):
+                return
+            await asyncio.sleep(interval)
+    finally:
+        job.finish()
+
+@app.get("/page/{url:path}")
+async def get_page_data(
+    url: str,
+    token_budget: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="comma-separated: " + ", ".join(LLM_PAGE_FIELDS))
+):
+    """Get processed page data optimized for LLM consumption"""
+    try:
+        selected = parse_fields(fields, set(LLM_PAGE_FIELDS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Decode URL
+        import urllib.parse
+        decoded_url = urllib.parse.unquote(url)
+        
+        page_data = await orchestrator.get_page_for_llm(decoded_url, token_budget, selected)
+        
+        if not page_data:
+            raise HTTPException(status_code=404, detail="Page not found")
+        
+        return FastJSONResponse(page_data)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
+
+@app.get("/related/{url:path}")
+async def get_related_pages(url: str, limit: int = Query(5, ge=1, le=50)):
+    """Pages related by links, co-citation and shared references"""
+    try:
+        import urllib.parse
+        decoded_url = urllib.parse.unquote(url)
+        
+        return {"url": decoded_url, "related": await orchestrator.get_related_pages(decoded_url, limit)}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Related pages failed: {str(e)}")
+
+@app.post("/search", response_model=SearchResponse)
+async def search_content(
+    request: SearchRequest,
+    fields: Optional[str] = Query(None, description="comma-separated: " + ", ".join(SEARCH_RESULT_FIELDS))
+):
+    """Search stored content for LLM context"""
+    try:
+        selected = parse_fields(fields, set(SEARCH_RESULT_FIELDS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        total, results = await orchestrator.search_for_llm(
+            request.query, request.limit, request.offset, request.token_budget,
+            request.include_relationships, selected
+        )
+        
+        return FastJSONResponse({"results": results, "total_found": total})
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@app.post("/semantic-search", response_model=SemanticSearchResponse)
+async def semantic_search(request: SemanticSearchRequest):
+    """Retrieve the stored chunks closest in meaning to the query"""
+    try:
+        started = time.perf_counter()
+        results = await orchestrator.semantic_search(request.query, request.k, request.token_budget)
+        
+        return SemanticSearchResponse(
+            results=results,
+            took_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Semantic search failed: {str(e)}")
+
+@app.get("/domain/{domain}/pages", response_model=DomainPagesResponse)
+async def list_domain_pages(
+    domain: str,
+    after: Optional[str] = Query(None, description="next_after cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """List a domain's pages with keyset pagination"""
+    try:
+        pages, next_after = await orchestrator.mongo_storage.get_pages_by_domain(domain, after, limit)
+        return DomainPagesResponse(domain=domain, pages=pages, next_after=next_after)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Listing failed: {str(e)}")
+
+@app.get("/export")
+async def export_pages(domain: Optional[str] = None, batch_size: int = Query(500, ge=1, le=5000)):
+    """Stream stored pages as NDJSON for dataset building"""
+    async def stream():
+        batch = []
+        async for document in orchestrator.mongo_storage.iter_pages(
+            EXPORT_PROJECTION, export_query(domain), batch_size
+        ):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield "".join(iter_ndjson(batch))
+                batch = []
+        if batch:
+            yield "".join(iter_ndjson(batch))
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/llm-ready/{url:path}")
+async def get_llm_ready_content(
+    url: str,
+    token_budget: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="comma-separated: " + ", ".join(LLM_READY_FIELDS))
+):
+    """Get content specifically formatted for LLM consumption"""
+    try:
+        selected = parse_fields(fields, set(LLM_READY_FIELDS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def want(name: str) -> bool:
+        return selected is None or name in selected
+    
+    try:
+        import urllib.parse
+        decoded_url = urllib.parse.unquote(url)
+        
+        page_fields = None
+        if selected is not None:
+            page_fields = set().union(*(LLM_READY_FIELDS[name] for name in selected))
+        page_data = await orchestrator.get_page_for_llm(decoded_url, token_budget, page_fields)
+        
+        if not page_data:
+            raise HTTPException(status_code=404, detail="Page not found")
+        
+        # Format for LLM
+        content = {}
+        if want("title"):
+            content["title"] = page_data["title"]
+        if want("main_content"):
+            content["main_content"] = page_data["content"]
+        if want("tokens_used"):
+            content["tokens_used"] = page_data["tokens_used"]
+        if want("structure"):
+            content["structure"] = {
+                "headings": page_data["headings"],
+                "content_type": page_data["study_metadata"]["content_type"],
+                "complexity": page_data["study_metadata"]["complexity_score"],
+                "reading_time": page_data["study_metadata"]["reading_time"]
+            }
+        if want("context"):
+            content["context"] = {
+                "related_pages": page_data["relationships"]["related_pages"],
+                "key_topics": page_data["study_metadata"]["key_topics"]
+            }
+        
+        llm_content = {
+            "instruction": "Use this content for generating summaries, notes, or mind maps",
+            "content": content
+        }
+        if want("suggestions"):
+            llm_content["suggestions"] = {
+                "study_approach": _get_study_approach(page_data["study_metadata"]),
+                "focus_areas": page_data["headings"][:3],
+                "difficulty_level": _assess_difficulty(page_data["study_metadata"])
+            }
+        
+        return FastJSONResponse(llm_content)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM formatting failed: {str(e)}")
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {"status": "healthy", "message": "Web scraper API is running"}
+
+@app.get("/stats")
+async def get_statistics():
+    """Get scraping statistics"""
+    try:
+        # Get basic stats from MongoDB
+        mongo_stats = await orchestrator.mongo_storage.collection.estimated_document_count()
+        
+        return {
+            "total_pages_scraped": mongo_stats,
+            "database_status": "connected",
+            "graph_ingest": await asyncio.to_thread(orchestrator.graph_queue.stats),
+            "job_queue": await asyncio.to_thread(job_queue.stats),
+            "features": [
+                "Dynamic content scraping with Playwright",
+                "DOM structure analysis",
+                "MongoDB storage for content",
+                "Neo4j for relationships",
+                "LLM-optimized data extraction"
+            ]
+        }
+    
+    except Exception as e:
+        return {"error": f"Stats retrieval failed: {str(e)}"}
+
+def _get_study_approach(metadata: Dict) -> str:
+    """Suggest study approach based on content analysis"""
+    content_type = metadata.get("content_type", "general")
+    complexity = metadata.get("complexity_score", 0)
+    
+    if content_type == "tutorial":
+        return "hands-on practice with step-by-step approach"
+    elif content_type == "documentation":
+        return "reference-based learning with examples"
+    elif content_type == "research":
+        return "analytical reading with note-taking"
+    elif complexity > 5:
+        return "detailed study with concept mapping"
+    else:
+        return "general reading with summary creation"
+
+def _assess_difficulty(metadata: Dict) -> str:
+    """Assess content difficulty for LLM processing hints"""
+    complexity = metadata.get("complexity_score", 0)
+    reading_time = metadata.get("reading_time", 0)
+    
+    if complexity < 2 and reading_time < 5:
+        return "beginner"
+    elif complexity < 5 and reading_time < 15:
+        return "intermediate"
+    else:
+        return "advanced"
+
+@app.on_event("startup")
+async def startup_event():
+    """Prepare storage on the server's event loop"""
+    global index_follower, recrawl_task
+    await orchestrator.startup()
+    index_follower = asyncio.create_task(orchestrator.follow_job_queue(job_queue))
+    
+    # Adaptive recrawls go through the same worker queue as /scrape-batch
+    recrawl_budget = getattr(settings.scraping, "recrawl_budget_per_hour", 0)
+    if recrawl_budget:
+        scheduler = RecrawlScheduler(recrawl_budget)
+        recrawl_task = asyncio.create_task(scheduler.run(orchestrator.mongo_storage, job_queue))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Clean up on shutdown"""
+    for task in (index_follower, recrawl_task, *discovery_tasks):
+        if task is not None:
+            task.cancel()
+    await orchestrator.close_connections()
+    job_queue.close()
+
+# Run the API
+if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,75 @@
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import datetime
+import heapq
+import itertools
+
+class Frontier:
+    """URLs waiting to be crawled, newest lastmod first, interleaved across domains.
+
+    Each domain keeps its own priority heap; a second heap orders domains
+    by (turn, best waiting URL), and a domain's turn advances with each
+    pop, so one large site does not crowd out the rest of a batch. A
+    domain whose best URL improves gets a fresh entry and the outdated one
+    is skipped on pop; a domain that empties and refills resumes at no
+    earlier turn than the one being served.
+    Crawl-delay is enforced by the workers when they fetch, not here.
+    """
+
+    def __init__(self):
+        self._seen: Set[str] = set()
+        self._domains: Dict[str, List[Tuple[float, int, str]]] = {}
+        self._ready: List[Tuple[int, float, str]] = []
+        self._turns: Dict[str, int] = {}
+        self._turn = 0
+        self._counter = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, url: str, lastmod: Optional[datetime.datetime] = None) -> bool:
+        """Queue a URL once; URLs without a lastmod go after dated ones"""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        priority = -lastmod.timestamp() if lastmod else float("inf")
+        domain = urlsplit(url).netloc
+        heap = self._domains.get(domain)
+        if heap is None:
+            heap = self._domains[domain] = []
+            self._turns[domain] = max(self._turns.get(domain, 0), self._turn)
+        best = heap[0][0] if heap else None
+        heapq.heappush(heap, (priority, next(self._counter), url))
+        if best is None or priority < best:
+            heapq.heappush(self._ready, (self._turns[domain], priority, domain))
+        self._size += 1
+        return True
+
+    def pop(self, limit: int) -> List[str]:
+        """Up to `limit` URLs, round-robin over domains, best first within each"""
+        urls: List[str] = []
+        while self._ready and len(urls) < limit:
+            turn, priority, domain = heapq.heappop(self._ready)
+            heap = self._domains.get(domain)
+            if not heap or turn != self._turns[domain] or priority != heap[0][0]:
+                continue  # Superseded by a fresher entry for this domain
+            _, _, url = heapq.heappop(heap)
+            urls.append(url)
+            self._size -= 1
+            self._turn = turn
+            self._turns[domain] = turn + 1
+            if heap:
+                heapq.heappush(self._ready, (turn + 1, heap[0][0], domain))
+            else:
+                del self._domains[domain]
+        return urls
+
+    def drain(self, queue, batch_size: int = 500) -> int:
+        """Enqueue every URL in frontier order; returns the count"""
+        released = 0
+        while self._size:
+            urls = self.pop(batch_size)
+            queue.enqueue(urls)
+            released += len(urls)
+        return released
@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import re
+import threading
+import time
+import requests
+
+class RobotsRules:
+    """Parsed robots.txt rules for one user agent.
+
+    Matching follows RFC 9309: the longest matching pattern wins and Allow
+    wins ties. All rules are compiled into one regex alternation ordered by
+    that precedence; the regex engine returns the first alternative that
+    matches, so a check is a single match call rather than a Python loop.
+    """
+
+    def __init__(self, rules: List[Tuple[str, bool]], crawl_delay: Optional[float], sitemaps: List[str]):
+        ordered = sorted(rules, key=lambda rule: (len(rule[0]), rule[1]), reverse=True)
+        self._pattern = re.compile("|".join(
+            f"(?P<{'a' if allow else 'd'}{index}>{_translate(pattern)})"
+            for index, (pattern, allow) in enumerate(ordered)
+        )) if ordered else None
+        self.crawl_delay = crawl_delay
+        self.sitemaps = sitemaps
+
+    @classmethod
+    def allow_all(cls) -> "RobotsRules":
+        return cls([], None, [])
+
+    @classmethod
+    def disallow_all(cls) -> "RobotsRules":
+        return cls([("/", False)], None, [])
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str) -> "RobotsRules":
+        """Pick the group for our agent (most specific product token match, else *)"""
+        agent = user_agent.lower()
+        groups: List[Tuple[List[str], List[Tuple[str, bool]], Optional[float]]] = []
+        sitemaps: List[str] = []
+        agents: List[str] = []
+        rules: List[Tuple[str, bool]] = []
+        delay: Optional[float] = None
+        in_rules = False
+
+        for line in text.splitlines():
+            field, _, value = line.split("#", 1)[0].partition(":")
+            field, value = field.strip().lower(), value.strip()
+            if field == "user-agent":
+                if in_rules:
+                    groups.append((agents, rules, delay))
+                    agents, rules, delay, in_rules = [], [], None, False
+                agents.append(value.lower())
+            elif field in ("allow", "disallow"):
+                in_rules = True
+                if value:
+                    rules.append((value, field == "allow"))
+            elif field == "crawl-delay":
+                in_rules = True
+                try:
+                    delay = float(value)
+                except ValueError:
+                    pass
+            elif field == "sitemap" and value:
+                sitemaps.append(value)
+        if agents:
+            groups.append((agents, rules, delay))
+
+        best, best_length = None, -1
+        for group_agents, group_rules, group_delay in groups:
+            for token in group_agents:
+                length = 0 if token == "*" else len(token)
+                if (token == "*" or token in agent) and length > best_length:
+                    best, best_length = (group_rules, group_delay), length
+        if best is None:
+            return cls([], None, sitemaps)
+        return cls(best[0], best[1], sitemaps)
+
+    def allowed(self, path: str) -> bool:
+        if path == "/robots.txt" or self._pattern is None:
+            return True
+        match = self._pattern.match(path)
+        return match is None or match.lastgroup[0] == "a"
+
+def _translate(pattern: str) -> str:
+    """Robots path pattern as regex source: * matches anything, a trailing $ anchors"""
+    anchored = pattern.endswith("$")
+    body = re.escape(pattern[:-1] if anchored else pattern).replace(r"\*", ".*")
+    return body + ("$" if anchored else "")
+
+class RobotsCache:
+    """robots.txt per origin, fetched once per TTL and checked without I/O.
+
+    Unreachable or 5xx robots.txt means disallow everything until a
+    shorter retry TTL passes; a 4xx means no restrictions. Safe to share
+    between threads: each origin is fetched by one thread at a time.
+    """
+
+    def __init__(self, user_agent: str, ttl: float = 24 * 3600, error_ttl: float = 600, timeout: float = 10.0):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self._entries: Dict[str, Tuple[float, RobotsRules]] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def rules(self, url: str) -> RobotsRules:
+        """Cached rules for the URL's origin, fetching them when missing or expired"""
+        origin = _origin(url)
+        entry = self._entries.get(origin)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(origin, threading.Lock())
+        with fetch_lock:
+            # Another thread may have fetched it while we waited
+            entry = self._entries.get(origin)
+            if entry is None or entry[0] <= time.time():
+                entry = self._fetch(origin)
+                self._entries[origin] = entry
+        return entry[1]
+
+    def cached(self, url: str) -> Optional[RobotsRules]:
+        """Rules if cached and fresh, without any network access"""
+        entry = self._entries.get(_origin(url))
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def allowed(self, url: str) -> bool:
+        return self.rules(url).allowed(robots_path(url))
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        return self.rules(url).crawl_delay
+
+    def sitemaps(self, url: str) -> List[str]:
+        """Sitemaps declared in robots.txt, else the conventional /sitemap.xml"""
+        return self.rules(url).sitemaps or [_origin(url) + "/sitemap.xml"]
+
+    def _fetch(self, origin: str) -> Tuple[float, RobotsRules]:
+        now = time.time()
+        try:
+            response = requests.get(
+                origin + "/robots.txt", headers={"User-Agent": self.user_agent}, timeout=self.timeout
+            )
+        except requests.RequestException:
+            return now + self.error_ttl, RobotsRules.disallow_all()
+        if response.status_code >= 500:
+            return now + self.error_ttl, RobotsRules.disallow_all()
+        if response.status_code >= 400:
+            return now + self.ttl, RobotsRules.allow_all()
+        return now + self.ttl, RobotsRules.parse(response.text, self.user_agent)
+
+def robots_path(url: str) -> str:
+    """The path and query robots.txt rules are matched against"""
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
@@ -0,0 +1,95 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+import time
+import uuid
+
+class Job:
+    """One scrape or batch run and the ordered events it has produced"""
+
+    def __init__(self, kind: str, urls: List[str], job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.urls = urls
+        self.events: List[Dict] = []
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def publish(self, event: Dict):
+        self.events.append(event)
+        self._wake()
+
+    def finish(self):
+        self.finished_at = time.time()
+        self._wake()
+
+    def _wake(self):
+        """Release current subscribers; later waits use a fresh event"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self, after: int = -1, keepalive: float = 15.0) -> AsyncIterator[Optional[Tuple[int, Dict]]]:
+        """Yield (index, event) from after+1 onwards until the job finishes
+
+        Yields None when nothing has happened for `keepalive` seconds so the
+        caller can keep idle connections open.
+        """
+        position = after + 1
+        while True:
+            if position >= len(self.events) and not self.done:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+            while position < len(self.events):
+                yield position, self.events[position]
+                position += 1
+            if self.done:
+                return
+
+class JobRegistry:
+    """In-process registry of recent jobs; finished jobs expire after ttl seconds"""
+
+    def __init__(self, ttl: float = 3600.0, max_jobs: int = 1000):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Job] = {}
+
+    def create(self, kind: str, urls: List[str], job_id: Optional[str] = None) -> Job:
+        self._evict()
+        job = Job(kind, urls, job_id)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _evict(self):
+        """Drop expired finished jobs, then the oldest finished ones over max_jobs"""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished_at > self.ttl:
+                del self._jobs[job_id]
+
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(self._jobs) - self.max_jobs + 1)]:
+            del self._jobs[job.id]
+
+def format_sse(index: int, event: Dict) -> str:
+    """Encode a stage event as a Server-Sent Event; the id allows Last-Event-ID resumes"""
+    return f"id: {index}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def stream_job_events(job: Job, after: int = -1) -> AsyncIterator[str]:
+    """SSE text for a job's events, ending once the job finishes"""
+    async for item in job.subscribe(after):
+        if item is None:
+            yield ": keepalive\n\n"
+        else:
+            yield format_sse(*item)
@@ -1,185 +1,598 @@
-import asyncio
-from typing import Dict, Optional,List
-from scraper.html_loader import HTMLLoader
-from scraper.data_extractor import DataExtractor
-from scraper.dom_analyzer import DOMAnalyzer
-from storage.mongo_storage import MongoStorage
-# from storage.neo4j_storage import Neo4jStorage
-from config.settings import settings
-
-class WebScrapingOrchestrator:
-    def __init__(self):
-        self.data_extractor = DataExtractor()
-        self.dom_analyzer = DOMAnalyzer()
-        self.mongo_storage = MongoStorage()
-        self.neo4j_storage = Neo4jStorage()
-    
-    async def process_url(self, url: str) -> Dict:
-        """Complete pipeline to process a URL for LLM consumption"""
-        try:
-            print(f"Processing URL: {url}")
-            
-            # Step 1: Load HTML content
-            async with HTMLLoader() as loader:
-                html_data = await loader.load_page(url)
-            
-            if not html_data:
-                return {"error": "Failed to load page"}
-            
-            print("✓ HTML loaded successfully")
-            
-            # Step 2: Extract structured data
-            extracted_data = self.data_extractor.extract_structured_data(
-                html_data["html"], 
-                html_data["url"]
-            )
-            
-            print("✓ Data extracted successfully")
-            
-            # Step 3: Analyze DOM structure
-            dom_structure = self.dom_analyzer.analyze_structure(html_data["html"])
-            
-            print("✓ DOM structure analyzed")
-            
-            # Step 4: Store in MongoDB
-            mongo_id = self.mongo_storage.store_page_data(
-                html_data["url"], 
-                extracted_data, 
-                dom_structure
-            )
-            
-            print("✓ Data stored in MongoDB")
-            
-            # Step 5: Store relationships in Neo4j
-            # self.neo4j_storage.store_relationships(
-            #     html_data["url"], 
-            #     extracted_data, 
-            #     dom_structure
-            # )
-            
-            # print("✓ Relationships stored in Neo4j")
-            
-            # Return LLM-ready summary
-            return {
-                "success": True,
-                "url": html_data["url"],
-                "title": html_data["title"],
-                "mongo_id": mongo_id,
-                "summary": {
-                    "content_blocks": len(extracted_data["content"]),
-                    "text_length": len(extracted_data["text_summary"]),
-                    "links_found": len(extracted_data["links"]),
-                    "images_found": len(extracted_data["images"]),
-                    "dom_depth": dom_structure["statistics"]["max_depth"],
-                    "content_type": self._identify_content_type(extracted_data)
-                },
-                "llm_ready_data": {
-                    "text_summary": extracted_data["text_summary"],
-                    "key_headings": [h["text"] for h in extracted_data["metadata"]["headings"][:5]],
-                    "main_topics": self._extract_main_topics(extracted_data),
-                    "study_hints": self._generate_study_hints(extracted_data, dom_structure)
-                }
-            }
-            
-        except Exception as e:
-            print(f"✗ Error processing {url}: {str(e)}")
-            return {"error": str(e), "url": url}
-    
-    def get_page_for_llm(self, url: str) -> Optional[Dict]:
-        """Retrieve page data optimized for LLM consumption"""
-        # Get from MongoDB
-        mongo_data = self.mongo_storage.get_page_data(url)
-        if not mongo_data:
-            return None
-        
-        # Get relationships from Neo4j
-        neo4j_data = self.neo4j_storage.get_page_relationships(url)
-        
-        # Combine for LLM
-        return {
-            "content": mongo_data["content"]["text_summary"],
-            "title": mongo_data["title"],
-            "headings": [h["text"] for h in mongo_data["content"]["headings"]],
-            "structure": mongo_data["study_metadata"],
-            "relationships": {
-                "related_pages": neo4j_data.get("internal_links", [])[:5],
-                "external_references": neo4j_data.get("external_links", [])[:3]
-            },
-            "study_metadata": mongo_data["study_metadata"]
-        }
-    
-    def search_for_llm(self, query: str, limit: int = 5) -> List[Dict]:
-        """Search content for LLM context"""
-        results = self.mongo_storage.search_pages(query, limit)
-        
-        llm_ready_results = []
-        for result in results:
-            llm_ready_results.append({
-                "url": result["url"],
-                "title": result["title"],
-                "summary": result["content"]["text_summary"][:500],
-                "content_type": result["study_metadata"]["content_type"],
-                "complexity": result["study_metadata"]["complexity_score"],
-                "key_topics": result["study_metadata"]["key_topics"][:5]
-            })
-        
-        return llm_ready_results
-    
-    def _identify_content_type(self, data: Dict) -> str:
-        """Identify content type for processing hints"""
-        title = data["metadata"]["title"].lower()
-        text = data["text_summary"].lower()
-        
-        if any(word in title for word in ["tutorial", "guide", "how to"]):
-            return "tutorial"
-        elif any(word in title for word in ["documentation", "docs", "api"]):
-            return "documentation"
-        elif any(word in title for word in ["blog", "article", "news"]):
-            return "article"
-        elif any(word in text for word in ["research", "study", "analysis"]):
-            return "research"
-        return "general"
-    
-    def _extract_main_topics(self, data: Dict) -> List[str]:
-        """Extract main topics for LLM understanding"""
-        topics = set()
-        
-        # From title
-        title_words = [word for word in data["metadata"]["title"].split() if len(word) > 3]
-        topics.update(title_words[:3])
-        
-        # From headings
-        for heading in data["metadata"]["headings"][:3]:
-            heading_words = [word for word in heading["text"].split() if len(word) > 3]
-            topics.update(heading_words[:2])
-        
-        return list(topics)[:5]
-    
-    def _generate_study_hints(self, extracted_data: Dict, dom_structure: Dict) -> Dict:
-        """Generate study hints for LLM processing"""
-        return {
-            "difficulty_level": "beginner" if len(extracted_data["text_summary"]) < 2000 else "intermediate",
-            "estimated_study_time": f"{len(extracted_data['text_summary'].split()) // 250} minutes",
-            "content_structure": "well_structured" if len(extracted_data["metadata"]["headings"]) > 3 else "basic",
-            "has_examples": "code" in extracted_data["text_summary"].lower(),
-            "interactive_elements": dom_structure["statistics"]["tag_distribution"].get("form", 0) > 0
-        }
-    
-    def close_connections(self):
-        """Close all database connections"""
-        self.neo4j_storage.close()
-
-# Main execution function
-async def main():
-    orchestrator = WebScrapingOrchestrator()
-    
-    # Example usage
-    test_url = "https://en.wikipedia.org/wiki/Virat_Kohli"
-    result = await orchestrator.process_url(test_url)
-    print(f"Processing result: {result}")
-    
-    # Clean up
-    orchestrator.close_connections()
-
-if __name__ == "__main__":
-    asyncio.run(main())
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, Optional,List, Set, Tuple
+from scraper.html_loader import HTMLLoader
+from scraper.data_extractor import DataExtractor
+from scraper.dom_analyzer import DOMAnalyzer
+from scraper.feature_extractor import FeatureExtractor, PageFeatures
+from scraper.fingerprint import fingerprint_sections
+from scraper.topics import load_topic_batcher
+from crawler.robots import RobotsCache, RobotsRules, robots_path
+from scraper.chunker import TextChunker, pack_chunks
+from storage.async_mongo_storage import AsyncMongoStorage
+from storage.mongo_storage import (
+    LLM_PAGE_PROJECTION,
+    SEARCH_RESULT_PROJECTION,
+    LINK_GRAPH_PROJECTION,
+    INDEX_PROJECTION,
+    RELATED_PAGE_PROJECTION,
+    CANONICAL_PAGES,
+    select_projection,
+)
+from storage.async_neo4j_storage import AsyncNeo4jStorage
+from storage.graph_queue import GraphIngestQueue
+from retrieval.text_index import TextIndex
+from retrieval.vector_index import VectorIndex
+from retrieval.link_graph import LinkGraph
+from retrieval.embedders import load_embedder
+from config.settings import settings
+
+# Relationship caps when building LLM context from the graph
+LLM_RELATIONSHIP_LIMITS = {"internal_links": 5, "external_links": 3, "headings": 0}
+
+# Output field -> the projection keys it is built from, for ?fields= pushdown
+LLM_PAGE_FIELDS = {
+    "content": ("content.text_summary",),
+    "tokens_used": (),
+    "title": ("title",),
+    "headings": ("content.headings",),
+    "structure": ("study_metadata",),
+    "relationships": (),
+    "study_metadata": ("study_metadata",),
+}
+SEARCH_RESULT_FIELDS = {
+    "url": (),
+    "score": (),
+    "title": ("title",),
+    "summary": ("summary",),
+    "content_type": ("study_metadata",),
+    "complexity": ("study_metadata",),
+    "key_topics": ("study_metadata",),
+    "context": (),
+    "relationships": (),
+}
+
+def select_fields(data: Dict, fields: Optional[Set[str]], always: Tuple[str, ...] = ()) -> Dict:
+    """Keep only the requested keys (plus `always`)"""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields or key in always}
+
+class WebScrapingOrchestrator:
+    def __init__(self, local_indexes: bool = True):
+        self.data_extractor = DataExtractor()
+        self.dom_analyzer = DOMAnalyzer()
+        self.feature_extractor = FeatureExtractor()
+        # One spaCy model per process, shared by every concurrent pipeline
+        self.topic_batcher = load_topic_batcher(
+            getattr(settings.extraction, "topic_extractor", "spacy:en_core_web_sm"),
+            max_topics=self.feature_extractor.max_topics
+        )
+        self.chunker = TextChunker(
+            max_tokens=getattr(settings.extraction, "chunk_max_tokens", 256),
+            overlap_tokens=getattr(settings.extraction, "chunk_overlap_tokens", 32)
+        )
+        self.mongo_storage = AsyncMongoStorage()
+        self.neo4j_storage = AsyncNeo4jStorage()
+        self.graph_queue = GraphIngestQueue(
+            batch_size=getattr(settings.database, "graph_ingest_batch_size", 500)
+        )
+        self._graph_consumer: Optional[asyncio.Task] = None
+        self.text_index = TextIndex()
+        self.vector_index = VectorIndex(
+            embedder=load_embedder(getattr(settings.extraction, "embedder", "hashing"))
+        )
+        self.link_graph = LinkGraph(
+            refresh_interval=getattr(settings.extraction, "link_graph_refresh_interval", 30.0)
+        )
+        self._link_graph_refresher: Optional[asyncio.Task] = None
+        
+        # Worker processes leave the local indexes to the API process, which
+        # follows their completions through the job queue
+        self.local_indexes = local_indexes
+        self.index_cursor_path = "data/job_queue.cursor"
+        
+        # A long-lived loader (one browser) when set, else one per page
+        self.html_loader: Optional[HTMLLoader] = None
+        
+        # robots.txt per origin, fetched at most once per TTL and checked before every load
+        self.robots = RobotsCache(
+            settings.scraping.user_agent, ttl=getattr(settings.scraping, "robots_ttl", 24 * 3600)
+        )
+        self.respect_robots = getattr(settings.scraping, "respect_robots", True)
+        
+        # Duplicates are always stored as aliases; this also skips their analysis
+        self.skip_duplicate_analysis = getattr(settings.scraping, "skip_duplicate_analysis", True)
+    
+    async def startup(self):
+        """Prepare storage once the event loop is running"""
+        await self.mongo_storage.ensure_indexes()
+        await self.neo4j_storage.ensure_constraints()
+        self._graph_consumer = asyncio.create_task(self.graph_queue.run(self.neo4j_storage))
+        
+        if not self.local_indexes:
+            return
+        
+        rebuild_text = not self.text_index.load()
+        rebuild_vectors = not self.vector_index.load()
+        rebuild_links = not self.link_graph.load()
+        if rebuild_text or rebuild_vectors or rebuild_links:
+            await self._rebuild_indexes(rebuild_text, rebuild_vectors, rebuild_links)
+        self._link_graph_refresher = asyncio.create_task(self.link_graph.run())
+    
+    async def _rebuild_indexes(self, text: bool, vectors: bool, links: bool = False):
+        """Index every stored page when no local index snapshot exists yet"""
+        if text:
+            projection = {"_id": 0, "url": 1, "title": 1, "description": 1, "content.text_summary": 1}
+            async for page in self.mongo_storage.iter_pages(projection, CANONICAL_PAGES):
+                self.text_index.add_document(
+                    page["url"], page["title"], page["description"], page["content"]["text_summary"]
+                )
+            self.text_index.save()
+        
+        if vectors:
+            async for document in self.mongo_storage.iter_page_chunks():
+                self.vector_index.add(document["url"], document["chunks"])
+            self.vector_index.save()
+        
+        if links:
+            async for page in self.mongo_storage.iter_pages(LINK_GRAPH_PROJECTION, CANONICAL_PAGES):
+                relationships = page.get("relationships", {})
+                self.link_graph.set_links(page["url"], [
+                    link["url"]
+                    for link in relationships.get("internal_links", []) + relationships.get("external_links", [])
+                ])
+            self.link_graph.save()
+    
+    async def process_url(self, url: str, durable: bool = True) -> Dict:
+        """Complete pipeline to process a URL for LLM consumption
+
+        With durable=False the MongoDB write is only buffered; the pending
+        write is returned under "pending_write" for the caller to await, and
+        the page's graph params under "pending_graph" for it to queue.
+        """
+        result = {}
+        async for event in self.process_url_stages(url, durable):
+            result = event["data"]
+        return result
+    
+    async def process_url_stages(self, url: str, durable: bool = True) -> AsyncIterator[Dict]:
+        """Run the process_url pipeline, yielding an event as each stage completes
+        
+        Events are {"stage", "url", "elapsed_ms", "stage_ms", "data"}. Stages
+        are loaded, extracted, duplicate (if any), analyzed, stored/queued,
+        then done with the full result; a failure ends with error instead.
+        """
+        started = last = time.perf_counter()
+        
+        def event(stage: str, data: Dict) -> Dict:
+            nonlocal last
+            now = time.perf_counter()
+            stage_ms, last = round((now - last) * 1000, 1), now
+            return {"stage": stage, "url": url, "elapsed_ms": round((now - started) * 1000, 1),
+                    "stage_ms": stage_ms, "data": data}
+        
+        try:
+            print(f"Processing URL: {url}")
+            
+            if self.respect_robots and not (await self.robots_rules(url)).allowed(robots_path(url)):
+                yield event("error", {"error": "Disallowed by robots.txt", "url": url})
+                return
+            
+            # Step 1: Load HTML content
+            if self.html_loader is not None:
+                html_data = await self.html_loader.load_page(url)
+            else:
+                async with HTMLLoader() as loader:
+                    html_data = await loader.load_page(url)
+            
+            if not html_data:
+                yield event("error", {"error": "Failed to load page"})
+                return
+            
+            print("✓ HTML loaded successfully")
+            yield event("loaded", {"url": html_data["url"], "title": html_data["title"]})
+            
+            # Step 2: Extract structured data
+            extracted_data = self.data_extractor.extract_structured_data(
+                html_data["html"], 
+                html_data["url"]
+            )
+            
+            print("✓ Data extracted successfully")
+            yield event("extracted", {
+                "title": extracted_data["metadata"]["title"],
+                "description": extracted_data["metadata"]["description"],
+                "headings": extracted_data["metadata"]["headings"],
+                "text_length": len(extracted_data["text_summary"])
+            })
+            
+            # Step 2b: Detect duplicate content before any heavier analysis
+            fingerprint = await asyncio.to_thread(fingerprint_sections, extracted_data["sections"])
+            await self.mongo_storage.record_visit(html_data["url"], fingerprint.exact_hash)
+            canonical_url = await self.mongo_storage.find_duplicate(fingerprint, html_data["url"])
+            
+            if canonical_url:
+                print(f"✓ Duplicate of {canonical_url}")
+                yield event("duplicate", {"duplicate_of": canonical_url})
+                if self.skip_duplicate_analysis:
+                    write = self.mongo_storage.queue_alias(html_data["url"], canonical_url, extracted_data)
+                    self._unindex_page(html_data["url"])
+                    result = await self._finish_write({
+                        "success": True,
+                        "url": html_data["url"],
+                        "title": html_data["title"],
+                        "duplicate_of": canonical_url
+                    }, write, durable)
+                    yield event("stored" if durable else "queued", {"mongo_id": result["mongo_id"]})
+                    yield event("done", result)
+                    return
+            
+            # Step 2c: Compute page features once for storage and response;
+            # topics are batched with other in-flight pages through spaCy
+            key_topics = await self.topic_batcher.extract(extracted_data) if self.topic_batcher else None
+            features = self.feature_extractor.extract_features(extracted_data, key_topics)
+            
+            # Step 2d: Split the full text into token-counted chunks
+            chunks = self.chunker.chunk_sections(extracted_data["sections"])
+            
+            # Step 3: Analyze DOM structure
+            dom_structure = self.dom_analyzer.analyze_structure(html_data["html"])
+            
+            print("✓ DOM structure analyzed")
+            
+            summary = {
+                "content_blocks": len(extracted_data["content"]),
+                "text_length": len(extracted_data["text_summary"]),
+                "chunks": len(chunks),
+                "total_tokens": sum(chunk["tokens"] for chunk in chunks),
+                "links_found": len(extracted_data["links"]),
+                "images_found": len(extracted_data["images"]),
+                "dom_depth": dom_structure["statistics"]["max_depth"],
+                "content_type": features.content_type
+            }
+            yield event("analyzed", {"summary": summary, "key_topics": list(features.key_topics[:5])})
+            
+            # Step 4: Store in MongoDB (duplicates only as an alias)
+            if canonical_url:
+                write = self.mongo_storage.queue_alias(html_data["url"], canonical_url, extracted_data)
+                self._unindex_page(html_data["url"])
+            else:
+                write = self.mongo_storage.queue_page_data(
+                    html_data["url"], 
+                    extracted_data, 
+                    dom_structure,
+                    features,
+                    fingerprint,
+                    chunks
+                )
+                self._index_page(html_data["url"], extracted_data, chunks)
+            
+            # Step 5: Relationships for Neo4j, queued once MongoDB has the page
+            graph_params = None
+            if not canonical_url:
+                graph_params = self.neo4j_storage.build_page_params(
+                    html_data["url"], 
+                    extracted_data, 
+                    dom_structure,
+                    features
+                )
+            
+            # Return LLM-ready summary
+            result = {
+                "success": True,
+                "url": html_data["url"],
+                "title": html_data["title"],
+                "duplicate_of": canonical_url,
+                "summary": summary,
+                "llm_ready_data": {
+                    "text_summary": extracted_data["text_summary"],
+                    "key_headings": [h["text"] for h in extracted_data["metadata"]["headings"][:5]],
+                    "main_topics": list(features.key_topics[:5]),
+                    "study_hints": self._generate_study_hints(extracted_data, dom_structure, features)
+                }
+            }
+            if graph_params is not None:
+                result["pending_graph"] = graph_params
+            result = await self._finish_write(result, write, durable)
+            yield event("stored" if durable else "queued", {"mongo_id": result["mongo_id"]})
+            yield event("done", result)
+            
+        except Exception as e:
+            print(f"✗ Error processing {url}: {str(e)}")
+            yield event("error", {"error": str(e), "url": url})
+    
+    async def robots_rules(self, url: str) -> RobotsRules:
+        """robots.txt rules for a URL; only an uncached or expired origin costs a fetch"""
+        return self.robots.cached(url) or await asyncio.to_thread(self.robots.rules, url)
+    
+    def _index_page(self, url: str, extracted_data: Dict, chunks: List[Dict]):
+        """Update the local search indexes for a stored page"""
+        if not self.local_indexes:
+            return
+        self.text_index.add_document(
+            url,
+            extracted_data["metadata"]["title"],
+            extracted_data["metadata"]["description"],
+            extracted_data["text_summary"]
+        )
+        self.vector_index.add(url, chunks)
+        self.link_graph.set_links(url, [link["url"] for link in extracted_data["links"]])
+    
+    def _unindex_page(self, url: str):
+        """Drop a page whose write failed from the local search indexes"""
+        if not self.local_indexes:
+            return
+        self.text_index.remove_document(url)
+        self.vector_index.remove(url)
+        self.link_graph.remove(url)
+    
+    async def follow_job_queue(self, queue, interval: float = 2.0):
+        """Index pages stored by worker processes, tailing the queue's completions
+        
+        The cursor is saved after each indexed batch, so a restart replays at
+        most one batch; re-indexing a page is idempotent.
+        """
+        os.makedirs(os.path.dirname(self.index_cursor_path), exist_ok=True)
+        cursor = "0"
+        if os.path.exists(self.index_cursor_path):
+            with open(self.index_cursor_path, encoding="utf-8") as f:
+                cursor = f.read().strip() or "0"
+        
+        while True:
+            try:
+                next_cursor, urls = await asyncio.to_thread(queue.completed_since, cursor)
+                if urls:
+                    await self._index_stored_pages(list(dict.fromkeys(urls)))
+                    cursor = next_cursor
+                    with open(self.index_cursor_path, "w", encoding="utf-8") as f:
+                        f.write(cursor)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"✗ Index sync failed: {str(e)}")
+            await asyncio.sleep(interval)
+    
+    async def _index_stored_pages(self, urls: List[str]):
+        """Refresh the local indexes for pages already in MongoDB"""
+        pages = await self.mongo_storage.get_pages_by_urls(urls, INDEX_PROJECTION)
+        canonical = [page for page in pages if "alias_of" not in page]
+        for page in pages:
+            if "alias_of" in page:
+                self._unindex_page(page["url"])
+        page_chunks = await self.mongo_storage.get_page_chunks([page["url"] for page in canonical])
+        
+        for page in canonical:
+            relationships = page.get("relationships", {})
+            self.text_index.add_document(
+                page["url"], page["title"], page["description"], page["content"]["text_summary"]
+            )
+            self.vector_index.add(page["url"], page_chunks.get(page["url"], []))
+            self.link_graph.set_links(page["url"], [
+                link["url"]
+                for link in relationships.get("internal_links", []) + relationships.get("external_links", [])
+            ])
+    
+    async def _finish_write(self, result: Dict, write: asyncio.Future, durable: bool) -> Dict:
+        """Await the MongoDB write, or hand it back as "pending_write" """
+        if durable:
+            # Flush now rather than waiting out the writer's max_age
+            await self.mongo_storage.flush()
+            result["pending_write"] = write
+            result = await self.complete_write(result)
+            print("✓ Data stored in MongoDB")
+        else:
+            result["mongo_id"] = None
+            result["pending_write"] = write
+            print("✓ Data queued for MongoDB")
+        return result
+    
+    async def complete_write(self, result: Dict) -> Dict:
+        """Await a durable=False result's pending write, then queue its graph params
+        
+        Pages completed this way within the writer's max_age share one bulk write.
+        """
+        write = result.pop("pending_write")
+        graph_params = result.pop("pending_graph", None)
+        try:
+            result["mongo_id"] = await write
+        except Exception:
+            self._unindex_page(result["url"])
+            raise
+        if graph_params is not None:
+            await asyncio.to_thread(self.graph_queue.enqueue, [graph_params])
+        return result
+    
+    async def get_page_for_llm(self, url: str, token_budget: Optional[int] = None,
+                               fields: Optional[Set[str]] = None) -> Optional[Dict]:
+        """Retrieve page data optimized for LLM consumption
+        
+        With a token_budget, content is the page's leading stored chunks
+        that fit the budget instead of the fixed-length summary. With
+        fields, only those keys are returned and only their data is read.
+        """
+        def want(name: str) -> bool:
+            return fields is None or name in fields
+        
+        # Get from MongoDB
+        mongo_data = await self.mongo_storage.get_page_data(
+            url, select_projection(LLM_PAGE_PROJECTION, LLM_PAGE_FIELDS, fields)
+        )
+        if not mongo_data:
+            return None
+        
+        page = {}
+        if want("content") or want("tokens_used"):
+            page["content"] = mongo_data.get("content", {}).get("text_summary")
+            page["tokens_used"] = None
+            if token_budget is not None:
+                page_chunks = await self.mongo_storage.get_page_chunks([mongo_data["url"]])
+                packed = pack_chunks(page_chunks.get(mongo_data["url"], []), token_budget)
+                page["content"] = "\n\n".join(chunk["text"] for chunk in packed)
+                page["tokens_used"] = sum(chunk["tokens"] for chunk in packed)
+        if want("title"):
+            page["title"] = mongo_data["title"]
+        if want("headings"):
+            page["headings"] = [h["text"] for h in mongo_data["content"]["headings"]]
+        if want("structure"):
+            page["structure"] = mongo_data["study_metadata"]
+        
+        if want("relationships"):
+            # Get relationships from Neo4j
+            neo4j_data = await self.neo4j_storage.get_page_relationships_batch(
+                [mongo_data["url"]], LLM_RELATIONSHIP_LIMITS
+            )
+            neo4j_data = neo4j_data.get(mongo_data["url"], {})
+            page["relationships"] = {
+                "related_pages": [related for related, _ in self.link_graph.related(mongo_data["url"], 5)],
+                "external_references": neo4j_data.get("external_links", [])[:3]
+            }
+        
+        if want("study_metadata"):
+            page["study_metadata"] = mongo_data["study_metadata"]
+        
+        # Combine for LLM
+        return select_fields(page, fields)
+    
+    async def get_related_pages(self, url: str, limit: int = 5) -> List[Dict]:
+        """Related stored pages from the in-memory link graph, best first"""
+        ranked = self.link_graph.related(url, limit)
+        scores = dict(ranked)
+        pages = await self.mongo_storage.get_pages_by_urls([url for url, _ in ranked], RELATED_PAGE_PROJECTION)
+        return [
+            {
+                "url": page["url"],
+                "title": page.get("title", ""),
+                "content_type": page.get("study_metadata", {}).get("content_type", "general"),
+                "score": scores[page["url"]],
+                "pagerank": round(self.link_graph.score(page["url"]), 4)
+            }
+            for page in pages
+        ]
+    
+    async def search_for_llm(self, query: str, limit: int = 5, offset: int = 0,
+                             token_budget: Optional[int] = None,
+                             include_relationships: bool = False,
+                             fields: Optional[Set[str]] = None) -> Tuple[int, List[Dict]]:
+        """Search content for LLM context; returns (total matches, one page of results)
+        
+        With a token_budget, each result also gets "context" chunks; the
+        budget is shared round-robin so every result gets its leading chunk
+        before any result gets a second. With include_relationships, each
+        result gets its graph links, fetched for the whole page in one query.
+        With fields, results keep only those keys (and url).
+        """
+        total, ranked = self.text_index.search(query, limit, offset)
+        scores = dict(ranked)
+        
+        results = await self.mongo_storage.get_pages_by_urls(
+            [url for url, _ in ranked],
+            select_projection(SEARCH_RESULT_PROJECTION, SEARCH_RESULT_FIELDS, fields)
+        )
+        
+        llm_ready_results = []
+        for result in results:
+            study_metadata = result.get("study_metadata", {})
+            llm_ready_results.append(select_fields({
+                "url": result["url"],
+                "score": scores[result["url"]],
+                "title": result.get("title"),
+                "summary": result.get("summary"),
+                "content_type": study_metadata.get("content_type"),
+                "complexity": study_metadata.get("complexity_score"),
+                "key_topics": study_metadata.get("key_topics", [])[:5]
+            }, fields, always=("url",)))
+        
+        if token_budget is not None and llm_ready_results:
+            page_chunks = await self.mongo_storage.get_page_chunks([r["url"] for r in llm_ready_results])
+            interleaved = sorted(
+                (
+                    (chunk["position"], rank, result["url"], chunk)
+                    for rank, result in enumerate(llm_ready_results)
+                    for chunk in page_chunks.get(result["url"], [])
+                ),
+                key=lambda item: item[:2]
+            )
+            packed = {id(chunk) for chunk in pack_chunks((item[3] for item in interleaved), token_budget)}
+            for result in llm_ready_results:
+                result["context"] = [
+                    chunk for chunk in page_chunks.get(result["url"], []) if id(chunk) in packed
+                ]
+        
+        if include_relationships and llm_ready_results:
+            relationships = await self.neo4j_storage.get_page_relationships_batch(
+                [r["url"] for r in llm_ready_results], LLM_RELATIONSHIP_LIMITS
+            )
+            for result in llm_ready_results:
+                neo4j_data = relationships.get(result["url"], {})
+                result["relationships"] = {
+                    "related_pages": [related for related, _ in self.link_graph.related(result["url"], 5)],
+                    "external_references": neo4j_data.get("external_links", [])
+                }
+        
+        return total, llm_ready_results
+    
+    async def semantic_search(self, query: str, k: int = 10, token_budget: Optional[int] = None) -> List[Dict]:
+        """Top-k stored chunks by embedding similarity
+        
+        With a token_budget, the best-ranked chunks that fit are returned
+        with their full stored text.
+        """
+        results = self.vector_index.search(query, k)
+        if token_budget is None:
+            return results
+        
+        results = pack_chunks(results, token_budget)
+        page_chunks = await self.mongo_storage.get_page_chunks(list({r["url"] for r in results}))
+        for result in results:
+            chunks = page_chunks.get(result["url"], [])
+            if result["chunk"] < len(chunks):
+                result["text"] = chunks[result["chunk"]]["text"]
+        return results
+    
+    def _generate_study_hints(self, extracted_data: Dict, dom_structure: Dict, features: PageFeatures) -> Dict:
+        """Generate study hints for LLM processing"""
+        return {
+            "difficulty_level": "beginner" if len(extracted_data["text_summary"]) < 2000 else "intermediate",
+            "estimated_study_time": f"{features.reading_time} minutes",
+            "content_structure": "well_structured" if len(extracted_data["metadata"]["headings"]) > 3 else "basic",
+            "has_examples": features.has_code,
+            "interactive_elements": dom_structure["statistics"]["tag_distribution"].get("form", 0) > 0
+        }
+    
+    async def close_connections(self):
+        """Close all database connections"""
+        for task in (self._link_graph_refresher, self._graph_consumer):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self.local_indexes:
+            self.text_index.save()
+            self.text_index.close()
+            self.vector_index.close()
+            self.link_graph.save()
+            self.link_graph.close()
+        self.graph_queue.close()
+        await self.mongo_storage.close()
+        await self.neo4j_storage.close()
+
+# Main execution function
+async def main():
+    orchestrator = WebScrapingOrchestrator()
+    await orchestrator.startup()
+    
+    # Example usage
+    test_url = "https://en.wikipedia.org/wiki/Virat_Kohli"
+    result = await orchestrator.process_url(test_url)
+    print(f"Processing result: {result}")
+    
+    # Clean up
+    await orchestrator.close_connections()
+
+if __name__ == "__main__":
+    asyncio.run(main())
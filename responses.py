@@ -0,0 +1,211 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+import gzip
+import json
+import zlib
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; falls back to the json module
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency; gzip is always available
+    zstandard = None
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when installed.
+
+    Handlers that return an instance directly also skip FastAPI's
+    jsonable_encoder pass. Datetimes serialize natively; anything else
+    unknown (e.g. ObjectId) falls back to str.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def parse_fields(fields: Optional[str], allowed: Set[str]) -> Optional[Set[str]]:
+    """Split a ?fields=a,b query parameter; None means every field"""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - allowed
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; allowed: {', '.join(sorted(allowed))}")
+    return requested
+
+# Compressed types; event streams are left alone so every event is flushed as sent
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+EXCLUDED_TYPES = ("text/event-stream",)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with zstd or gzip per Accept-Encoding.
+
+    Complete bodies below minimum_size go out uncompressed. Streamed
+    bodies are compressed incrementally, flushing after every chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSender(self, send, encoding).send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def compressor(self, encoding: str):
+        """Incremental compressor exposing compress(chunk) and finish()"""
+        if encoding == "zstd":
+            return _ZstdStream(zstandard.ZstdCompressor(level=self.zstd_level).compressobj())
+        return _GzipStream(zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS))
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header; zstd wins ties"""
+    supported = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    candidates = [(weights.get(coding, weights.get("*", 0.0)), -rank, coding) for rank, coding in enumerate(supported)]
+    quality, _, coding = max(candidates)
+    return coding if quality > 0 else None
+
+class _GzipStream:
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressobj.compress(chunk) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush(zlib.Z_FINISH)
+
+class _ZstdStream:
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressobj.compress(chunk) + self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+class _CompressingSender:
+    """Wraps `send` for one response, deciding on its first body message"""
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str):
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self._start: Optional[Dict] = None
+        self._stream = None
+        self._passthrough = False
+
+    async def send(self, message: Dict):
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start is not None:
+            start, self._start = self._start, None
+            headers = _Headers(start["headers"])
+            content_type = headers.get("content-type")
+            self._passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or content_type.startswith(EXCLUDED_TYPES)
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            )
+            if self._passthrough:
+                await self._send(start)
+            elif not more_body:
+                body = self.middleware.compress(self.encoding, body)
+                headers.set("content-encoding", self.encoding)
+                headers.set("content-length", str(len(body)))
+                headers.add_vary()
+                await self._send({**start, "headers": headers.raw})
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            else:
+                self._stream = self.middleware.compressor(self.encoding)
+                headers.remove("content-length")
+                headers.set("content-encoding", self.encoding)
+                headers.add_vary()
+                await self._send({**start, "headers": headers.raw})
+
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        data = self._stream.compress(body) if body else b""
+        if not more_body:
+            data += self._stream.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+class _Headers:
+    """Minimal mutable view over raw ASGI header pairs"""
+
+    def __init__(self, raw: List[Tuple[bytes, bytes]]):
+        self.raw = list(raw)
+
+    def __contains__(self, name: str) -> bool:
+        key = name.encode("latin-1")
+        return any(header == key for header, _ in self.raw)
+
+    def get(self, name: str) -> str:
+        key = name.encode("latin-1")
+        for header, value in self.raw:
+            if header == key:
+                return value.decode("latin-1").lower()
+        return ""
+
+    def remove(self, name: str):
+        key = name.encode("latin-1")
+        self.raw = [(header, value) for header, value in self.raw if header != key]
+
+    def set(self, name: str, value: str):
+        self.remove(name)
+        self.raw.append((name.encode("latin-1"), value.encode("latin-1")))
+
+    def add_vary(self):
+        vary = self.get("vary")
+        if "accept-encoding" not in vary:
+            self.set("vary", f"{vary}, Accept-Encoding" if vary else "Accept-Encoding")
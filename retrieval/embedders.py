@@ -0,0 +1,61 @@
+from typing import List, Protocol
+import zlib
+import numpy as np
+from retrieval.text_index import tokenize
+
+class Embedder(Protocol):
+    """Anything that turns texts into L2-normalized float32 row vectors"""
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+class HashingEmbedder:
+    """Feature-hashing embedder over unigrams and bigrams.
+
+    Needs no model download and is deterministic across processes
+    (crc32, not Python's salted hash), so vectors written by one worker
+    are comparable with queries embedded by another.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                # Low bits pick the bucket, the top bit picks the sign
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+
+        # Sublinear term frequency, then unit length for cosine scoring
+        np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model; loads from the local cache only"""
+
+    def __init__(self, model_name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("sentence-transformers is required for this embedder")
+        self.model = SentenceTransformer(model_name, local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+def load_embedder(spec: str = "hashing") -> Embedder:
+    """Build an embedder from a spec: "hashing", "hashing:<dim>" or "st:<model>" """
+    kind, _, arg = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(arg) if arg else 512)
+    if kind == "st":
+        return SentenceTransformerEmbedder(arg)
+    raise ValueError(f"Unknown embedder: {spec}")
@@ -0,0 +1,280 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import asyncio
+import gzip
+import json
+import os
+import numpy as np
+
+class GraphSnapshot(NamedTuple):
+    """Compiled view of the graph at one point in time"""
+    n: int
+    indptr: np.ndarray
+    indices: np.ndarray
+    indptr_t: np.ndarray
+    indices_t: np.ndarray
+    crawled: np.ndarray
+    pagerank: np.ndarray
+
+class LinkGraph:
+    """In-process directed link graph with PageRank and related-page scoring.
+
+    URLs are interned to integer ids. Each crawled page's out-links are kept
+    per node and compiled into a snapshot: CSR adjacency, its transpose and
+    global PageRank, which scoring runs over with NumPy. Link changes only
+    mark the graph dirty; run() recompiles at most every refresh_interval
+    seconds in a thread, warm-starting PageRank from the previous ranks,
+    and reads keep serving the last snapshot meanwhile. Changes are
+    appended to a JSONL change log; save() writes a gzipped snapshot of
+    every crawled page's out-links and truncates the log.
+    """
+
+    def __init__(self, path: str = "data/link_graph.jsonl.gz", damping: float = 0.85,
+                 tolerance: float = 1e-6, max_iterations: int = 100, refresh_interval: float = 30.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.log_path = path + ".log"
+        self.damping = damping
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+        self._ids: Dict[str, int] = {}
+        self._urls: List[str] = []
+        self._out: List[Optional[np.ndarray]] = []  # None for pages only seen as link targets
+        self._crawled_count = 0
+        self._log = None
+
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return self._crawled_count
+
+    def set_links(self, url: str, targets: Iterable[str]):
+        """Replace a crawled page's out-links"""
+        targets = list(dict.fromkeys(target for target in targets if target != url))
+        self._set_links(url, targets)
+        self._append_log({"url": url, "links": targets})
+
+    def remove(self, url: str):
+        """Forget a page's out-links; it stays a node while others link to it"""
+        node = self._ids.get(url)
+        if node is not None and self._out[node] is not None:
+            self._out[node] = None
+            self._crawled_count -= 1
+            self._invalidate()
+            self._append_log({"url": url, "deleted": True})
+
+    async def run(self):
+        """Recompile the snapshot whenever links changed, at most every refresh_interval seconds"""
+        while True:
+            if self._dirty or self._snapshot is None:
+                await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self):
+        """Compile a new snapshot off the event loop"""
+        self._dirty = False
+        rows = list(self._out)
+        self._snapshot = await asyncio.to_thread(self._compile, rows, self._snapshot)
+
+    def pagerank(self, personalization: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """PageRank over the snapshot's nodes; teleports to `personalization` weights when given"""
+        snapshot = self._current()
+        if personalization is None:
+            return snapshot.pagerank
+
+        teleport = np.zeros(snapshot.n)
+        for url, weight in personalization.items():
+            node = self._ids.get(url)
+            if node is not None and node < snapshot.n:
+                teleport[node] = weight
+        if not teleport.any():
+            return np.zeros(snapshot.n)
+        return self._power_iteration(snapshot.indptr, snapshot.indices, teleport / teleport.sum())
+
+    def _power_iteration(self, indptr: np.ndarray, indices: np.ndarray, teleport: np.ndarray,
+                         start: Optional[np.ndarray] = None) -> np.ndarray:
+        n = len(teleport)
+        degree = np.diff(indptr)
+        sources = np.repeat(np.arange(n), degree)
+        inverse_degree = np.zeros(n)
+        np.divide(1.0, degree, out=inverse_degree, where=degree > 0)
+        dangling = degree == 0
+
+        rank = teleport.copy() if start is None else start
+        for _ in range(self.max_iterations):
+            spread = np.bincount(indices, weights=(rank * inverse_degree)[sources], minlength=n)
+            # Rank held by pages without out-links is redistributed like teleportation
+            updated = self.damping * (spread + rank[dangling].sum() * teleport) + (1 - self.damping) * teleport
+            converged = np.abs(updated - rank).sum() < self.tolerance
+            rank = updated
+            if converged:
+                break
+        return rank
+
+    def score(self, url: str) -> float:
+        """Global PageRank of a URL, scaled so the average page scores 1.0"""
+        snapshot = self._current()
+        node = self._ids.get(url)
+        if node is None or node >= snapshot.n:
+            return 0.0
+        return float(snapshot.pagerank[node] * snapshot.n)
+
+    def related(self, url: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Crawled pages most related to `url`.
+
+        Scores combine direct links both ways, co-citation (pages linked
+        from the same parents) and coupling (pages linking to the same
+        targets), normalized by degree. Pages with no such overlap fall
+        back to the top pages by global PageRank.
+        """
+        snapshot = self._current()
+        node = self._ids.get(url)
+        if node is None or node >= snapshot.n or not snapshot.crawled.any():
+            return []
+
+        n = snapshot.n
+        indptr, indices = snapshot.indptr, snapshot.indices
+        indptr_t, indices_t = snapshot.indptr_t, snapshot.indices_t
+        out_links = indices[indptr[node]:indptr[node + 1]]
+        in_links = indices_t[indptr_t[node]:indptr_t[node + 1]]
+
+        scores = np.zeros(n)
+        scores[out_links] += 1.0
+        scores[in_links] += 1.0
+        cocited = [indices[indptr[parent]:indptr[parent + 1]] for parent in in_links]
+        coupled = [indices_t[indptr_t[target]:indptr_t[target + 1]] for target in out_links]
+        neighbours = cocited + coupled
+        if neighbours:
+            scores += np.bincount(np.concatenate(neighbours), minlength=n)
+
+        degree = np.diff(indptr) + np.diff(indptr_t)
+        scores /= np.sqrt(np.maximum(degree, 1) * max(degree[node], 1))
+        scores[node] = 0.0
+        scores[~snapshot.crawled] = 0.0
+        if not scores.any():
+            scores = snapshot.pagerank.copy()
+            scores[node] = 0.0
+            scores[~snapshot.crawled] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if candidates.size == 0:
+            return []
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:limit]]
+        return [(self._urls[i], round(float(scores[i]), 4)) for i in top]
+
+    def save(self):
+        """Atomically snapshot every crawled page's links and truncate the change log"""
+        self._ensure_directory()
+
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for node, out in enumerate(self._out):
+                if out is not None:
+                    f.write(json.dumps({"url": self._urls[node], "links": [self._urls[t] for t in out]}) + "\n")
+        os.replace(tmp_path, self.path)
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def load(self) -> bool:
+        """Replay the snapshot and change log; False if neither exists"""
+        found = False
+
+        if os.path.exists(self.path):
+            found = True
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._set_links(entry["url"], entry["links"])
+
+        if os.path.exists(self.log_path):
+            found = True
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn final line from an interrupted write
+                    if entry.get("deleted"):
+                        node = self._ids.get(entry["url"])
+                        if node is not None and self._out[node] is not None:
+                            self._out[node] = None
+                            self._crawled_count -= 1
+                    else:
+                        self._set_links(entry["url"], entry["links"])
+
+        self._snapshot = None
+        return found
+
+    def close(self):
+        """Close the change log"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _intern(self, url: str) -> int:
+        node = self._ids.get(url)
+        if node is None:
+            node = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+            self._out.append(None)
+        return node
+
+    def _set_links(self, url: str, targets: List[str]):
+        node = self._intern(url)
+        if self._out[node] is None:
+            self._crawled_count += 1
+        self._out[node] = np.array(sorted({self._intern(target) for target in targets}), dtype=np.int32)
+        self._invalidate()
+
+    def _invalidate(self):
+        self._dirty = True
+
+    def _current(self) -> GraphSnapshot:
+        """The last compiled snapshot; compiled inline only before the first refresh"""
+        if self._snapshot is None:
+            self._dirty = False
+            self._snapshot = self._compile(list(self._out), None)
+        return self._snapshot
+
+    def _compile(self, rows: List[Optional[np.ndarray]], previous: Optional[GraphSnapshot]) -> GraphSnapshot:
+        """CSR, transpose and PageRank for a copy of the out-link rows"""
+        n = len(rows)
+        empty = np.zeros(0, dtype=np.int32)
+        crawled = np.array([row is not None for row in rows], dtype=bool)
+        rows = [row if row is not None else empty for row in rows]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.concatenate(rows) if rows else empty
+
+        sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        indptr_t = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=n), out=indptr_t[1:])
+
+        pagerank = np.zeros(0)
+        if n:
+            teleport = np.full(n, 1.0 / n)
+            start = None
+            if previous is not None and previous.n:
+                # Warm start: a few changed links barely move the ranks
+                start = np.concatenate([previous.pagerank, teleport[previous.n:]])
+                start /= start.sum()
+            pagerank = self._power_iteration(indptr, indices, teleport, start)
+        return GraphSnapshot(n, indptr, indices, indptr_t, sources[order], crawled, pagerank)
+
+    def _ensure_directory(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _append_log(self, entry: Dict):
+        if self._log is None:
+            self._ensure_directory()
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        self._log.write(json.dumps(entry) + "\n")
+        self._log.flush()
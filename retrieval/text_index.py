@@ -0,0 +1,338 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import bisect
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for both indexing and queries"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _tokens(entry: Dict) -> List[str]:
+    """Stored tokens, space-joined (or a list in older files)"""
+    tokens = entry["tokens"]
+    return tokens.split() if isinstance(tokens, str) else tokens
+
+class TextIndex:
+    """In-process inverted index with BM25 ranking.
+
+    Queries support plain terms (ranked, any may match), "quoted phrases"
+    (must match in order) and prefix* terms (expanded against the sorted
+    vocabulary). Every change is appended to a JSONL change log; save()
+    compacts the live documents into a gzipped snapshot and truncates the
+    log, and load() replays snapshot then log. Tokens are stored
+    space-joined, which is lossless since they are \w+ runs.
+
+    A re-indexed URL keeps its doc id and removed ids are reused. Entries
+    superseded by a re-index or delete count as tombstones; once they
+    reach compact_ratio of the live documents (and at least
+    compact_min_tombstones), the next change compacts: the log is rotated
+    aside and a copy of the live documents is snapshotted in a thread when
+    an event loop is running, so requests are not stalled by the rewrite.
+    """
+
+    def __init__(self, path: str = "data/text_index.jsonl.gz", k1: float = 1.2, b: float = 0.75,
+                 title_boost: int = 2, max_expansions: int = 50, compact_ratio: float = 0.5,
+                 compact_min_tombstones: int = 1000):
+        self.path = path
+        self.log_path = path + ".log"
+        self.rotated_log_path = path + ".log.old"
+        self.k1 = k1
+        self.b = b
+        self.title_boost = title_boost
+        self.max_expansions = max_expansions
+        self.compact_ratio = compact_ratio
+        self.compact_min_tombstones = compact_min_tombstones
+
+        self._doc_ids: Dict[str, int] = {}
+        self._urls: List[Optional[str]] = []
+        self._tokens: List[Optional[List[str]]] = []
+        self._free_ids: List[int] = []
+        self._tombstones = 0
+        self._postings: Dict[str, Dict[int, List[int]]] = {}
+        self._total_length = 0
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._log = None
+        self._compaction: Optional[asyncio.Task] = None
+        # Serializes snapshot writes; _snapshot_version keeps an older copy from replacing a newer one
+        self._snapshot_lock = threading.Lock()
+        self._version = 0
+        self._snapshot_version = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def add_document(self, url: str, title: str, description: str, text: str):
+        """Index (or re-index) a page"""
+        tokens = tokenize(title) * self.title_boost + tokenize(description) + tokenize(text)
+        self._add_tokens(url, tokens)
+        self._append_log({"url": url, "tokens": " ".join(tokens)})
+        self._maybe_compact()
+
+    def remove_document(self, url: str):
+        """Drop a page from the index"""
+        if self._remove(url):
+            self._append_log({"url": url, "deleted": True})
+            self._maybe_compact()
+
+    def _remove(self, url: str) -> bool:
+        doc_id = self._doc_ids.pop(url, None)
+        if doc_id is None:
+            return False
+
+        self._clear(doc_id)
+        self._urls[doc_id] = None
+        self._free_ids.append(doc_id)
+        # The superseded entry and the delete entry itself
+        self._tombstones += 2
+        return True
+
+    def _clear(self, doc_id: int):
+        """Drop a document's postings, keeping its id"""
+        tokens = self._tokens[doc_id]
+        for term in set(tokens):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+        self._total_length -= len(tokens)
+        self._tokens[doc_id] = None
+
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> Tuple[int, List[Tuple[str, float]]]:
+        """Return (total matches, [(url, score), ...]) for one result page"""
+        terms, phrases = self._parse_query(query)
+        if not terms and not phrases:
+            return 0, []
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for expanded in self._expand(term):
+                self._accumulate(expanded, scores)
+
+        # Phrases are required: restrict to documents containing every phrase
+        required: Optional[Set[int]] = None
+        for phrase in phrases:
+            matches = self._phrase_matches(phrase)
+            required = matches if required is None else required & matches
+            for term in set(phrase):
+                self._accumulate(term, scores, only=matches)
+
+        if required is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if doc_id in required}
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+        return len(scores), [(self._urls[doc_id], round(score, 4)) for doc_id, score in top[offset:]]
+
+    def save(self):
+        """Atomically snapshot the live documents and truncate the change log"""
+        self._tombstones = 0
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._write_snapshot(self._documents(), self._version, [self.rotated_log_path, self.log_path])
+
+    async def _compact_in_background(self):
+        """Rotate the log, then snapshot a copy of the live documents in a thread"""
+        try:
+            self._tombstones = 0
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            # Changes from here on go to a fresh log, which survives this snapshot
+            if os.path.exists(self.log_path):
+                os.replace(self.log_path, self.rotated_log_path)
+            await asyncio.to_thread(
+                self._write_snapshot, self._documents(), self._version, [self.rotated_log_path]
+            )
+        except Exception as e:
+            print(f"✗ Text index compaction failed: {str(e)}")
+        finally:
+            self._compaction = None
+
+    def _documents(self) -> List[Tuple[str, List[str]]]:
+        # Token lists are replaced, never mutated, so the copy can be read from a thread
+        return [(url, self._tokens[doc_id]) for url, doc_id in self._doc_ids.items()]
+
+    def _write_snapshot(self, documents: List[Tuple[str, List[str]]], version: int, logs: List[str]):
+        """Write documents as the snapshot, then drop the logs it covers"""
+        self._ensure_directory()
+        with self._snapshot_lock:
+            if version < self._snapshot_version:
+                return
+            tmp_path = self.path + ".tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for url, tokens in documents:
+                    f.write(json.dumps({"url": url, "tokens": " ".join(tokens)}) + "\n")
+            os.replace(tmp_path, self.path)
+            self._snapshot_version = version
+            for log_path in logs:
+                if os.path.exists(log_path):
+                    os.remove(log_path)
+
+    def load(self) -> bool:
+        """Replay the snapshot and change log; False if neither exists"""
+        found = False
+
+        if os.path.exists(self.path):
+            found = True
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._add_tokens(entry["url"], _tokens(entry))
+
+        # A rotated log means a compaction was interrupted; it is older than the current log
+        interrupted = os.path.exists(self.rotated_log_path)
+        for log_path in (self.rotated_log_path, self.log_path):
+            if not os.path.exists(log_path):
+                continue
+            found = True
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn final line from an interrupted write
+                    if entry.get("deleted"):
+                        self._remove(entry["url"])
+                    else:
+                        self._add_tokens(entry["url"], _tokens(entry))
+
+        if interrupted:
+            self.save()
+        return found
+
+    def close(self):
+        """Close the change log"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _ensure_directory(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _append_log(self, entry: Dict):
+        self._version += 1
+        if self._log is None:
+            self._ensure_directory()
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        self._log.write(json.dumps(entry) + "\n")
+        self._log.flush()
+
+    def _maybe_compact(self):
+        if self._compaction is not None:
+            return
+        if self._tombstones >= max(self.compact_min_tombstones, self.compact_ratio * len(self._doc_ids)):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.save()
+                return
+            self._compaction = loop.create_task(self._compact_in_background())
+
+    def _add_tokens(self, url: str, tokens: List[str]):
+        doc_id = self._doc_ids.get(url)
+        if doc_id is not None:
+            self._clear(doc_id)
+            self._tombstones += 1
+        elif self._free_ids:
+            doc_id = self._free_ids.pop()
+            self._doc_ids[url] = doc_id
+            self._urls[doc_id] = url
+        else:
+            doc_id = len(self._urls)
+            self._doc_ids[url] = doc_id
+            self._urls.append(url)
+            self._tokens.append(None)
+        self._tokens[doc_id] = tokens
+        self._total_length += len(tokens)
+
+        for position, term in enumerate(tokens):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary_dirty = True
+            postings.setdefault(doc_id, []).append(position)
+
+    def _parse_query(self, query: str) -> Tuple[List[str], List[List[str]]]:
+        terms, phrases = [], []
+        for phrase, word in QUERY_PATTERN.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if len(tokens) > 1:
+                    phrases.append(tokens)
+                else:
+                    terms.extend(tokens)
+            elif word.endswith("*") and tokenize(word):
+                terms.append(tokenize(word)[0] + "*")
+            else:
+                terms.extend(tokenize(word))
+        return terms, phrases
+
+    def _expand(self, term: str) -> Iterable[str]:
+        """Expand prefix* terms against the sorted vocabulary"""
+        if not term.endswith("*"):
+            return [term]
+
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+
+        prefix = term[:-1]
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        expanded = []
+        for candidate in self._vocabulary[start:start + self.max_expansions]:
+            if not candidate.startswith(prefix):
+                break
+            expanded.append(candidate)
+        return expanded
+
+    def _accumulate(self, term: str, scores: Dict[int, float], only: Optional[Set[int]] = None):
+        """Add the BM25 contribution of one term to every matching document"""
+        postings = self._postings.get(term)
+        if not postings:
+            return
+
+        doc_count = len(self._doc_ids)
+        average_length = self._total_length / doc_count
+        idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+
+        for doc_id, positions in postings.items():
+            if only is not None and doc_id not in only:
+                continue
+            tf = len(positions)
+            norm = self.k1 * (1 - self.b + self.b * len(self._tokens[doc_id]) / average_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+    def _phrase_matches(self, phrase: List[str]) -> Set[int]:
+        """Documents containing the phrase terms at consecutive positions"""
+        postings = [self._postings.get(term) for term in phrase]
+        if not all(postings):
+            return set()
+
+        # Start from the rarest term and verify the others by offset
+        anchor = min(range(len(phrase)), key=lambda i: len(postings[i]))
+        candidates = set(postings[anchor])
+        for other in postings:
+            candidates &= other.keys()
+
+        matches = set()
+        for doc_id in candidates:
+            positions = [set(postings[i][doc_id]) for i in range(len(phrase))]
+            for start in postings[anchor][doc_id]:
+                base = start - anchor
+                if all(base + i in positions[i] for i in range(len(phrase))):
+                    matches.add(doc_id)
+                    break
+        return matches
@@ -0,0 +1,382 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import numpy as np
+from retrieval.embedders import Embedder, HashingEmbedder
+
+class VectorIndex:
+    """Chunk vectors in a memory-mapped float32 matrix with brute-force and IVF search.
+
+    Layout under `directory`:
+      vectors.f32  row-major matrix, grown by doubling
+      rows.jsonl   append-only log of added rows (url, chunk, tokens, preview) and
+                   deleted URLs; the source of truth on load
+      ivf.npz      k-means centroids and per-row list assignments
+      meta.json    vector dimension, checked against the embedder on load
+
+    Re-adding a URL tombstones its old rows; save() compacts both files
+    once tombstones make up compact_ratio of the rows. Once trained, new
+    rows are assigned to their nearest centroid as they arrive, so the IVF
+    lists stay complete between retrainings. Training triggered by add()
+    runs in a thread when an event loop is running.
+    """
+
+    def __init__(self, directory: str = "data/vectors", embedder: Optional[Embedder] = None,
+                 ivf_threshold: int = 20000, nprobe: int = 8, preview_chars: int = 300,
+                 compact_ratio: float = 0.25):
+        self.directory = directory
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.preview_chars = preview_chars
+        self.compact_ratio = compact_ratio
+
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._rows_path = os.path.join(directory, "rows.jsonl")
+        self._ivf_path = os.path.join(directory, "ivf.npz")
+        self._meta_path = os.path.join(directory, "meta.json")
+
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._count = 0
+        self._rows: List[Dict] = []
+        self._live = np.zeros(0, dtype=bool)
+        self._live_count = 0
+        self._url_rows: Dict[str, List[int]] = {}
+        self._log = None
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_count = 0
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._training: Optional[asyncio.Task] = None
+        # Bumped by compaction, which renumbers rows under an in-flight training
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._url_rows)
+
+    def add(self, url: str, chunks: List[Dict]):
+        """Embed and index a page's {"position", "text", "tokens"} chunks, replacing any previous version"""
+        self.remove(url)
+        chunks = [chunk for chunk in chunks if chunk["text"].strip()]
+        if not chunks:
+            return
+
+        vectors = self.embedder.embed([chunk["text"] for chunk in chunks])
+        start = self._count
+        self._reserve(start + len(chunks))
+        self._vectors[start:start + len(chunks)] = vectors
+
+        for chunk in chunks:
+            entry = {
+                "url": url,
+                "chunk": chunk["position"],
+                "tokens": chunk["tokens"],
+                "preview": chunk["text"][:self.preview_chars]
+            }
+            self._append_row(entry)
+            self._log_entry(entry)
+
+        if self._centroids is not None:
+            self._assignments[start:self._count] = self._nearest_centroids(vectors)
+            self._lists = None
+        self._maybe_train()
+
+    def remove(self, url: str):
+        """Tombstone a page's rows"""
+        rows = self._url_rows.pop(url, None)
+        if rows:
+            self._live[rows] = False
+            self._live_count -= len(rows)
+            self._log_entry({"delete": url})
+
+    def search(self, query: str, k: int = 10, exact: bool = False) -> List[Dict]:
+        """Top-k chunks by cosine similarity; IVF unless exact or untrained"""
+        if not self._url_rows:
+            return []
+
+        q = self.embedder.embed([query])[0]
+        if exact or self._centroids is None:
+            candidates = np.arange(self._count)
+            scores = self._scan(q)
+        else:
+            candidates = self._probe(q)
+            scores = self._vectors[candidates] @ q
+        if candidates.size == 0:
+            return []
+
+        top = np.argpartition(-scores, min(k, scores.size) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+
+        results = []
+        for i in top:
+            row = self._rows[candidates[i]]
+            results.append({
+                "url": row["url"],
+                "chunk": row["chunk"],
+                "tokens": row["tokens"],
+                "preview": row["preview"],
+                "score": round(float(scores[i]), 4)
+            })
+        return results
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 50000):
+        """Fit IVF centroids with k-means on a sample of live rows"""
+        live_rows = np.flatnonzero(self._live[:self._count])
+        if live_rows.size == 0:
+            return
+        self._install(*self._fit(self._vectors, live_rows, self._count, nlist, iterations, sample_size))
+
+    async def _train_in_background(self):
+        live_rows = np.flatnonzero(self._live[:self._count])
+        count, generation = self._count, self._generation
+        try:
+            # Rows below `count` are never rewritten in place, so the thread can read them while add() appends
+            fitted = await asyncio.to_thread(self._fit, self._vectors, live_rows, count)
+            if generation == self._generation:
+                self._install(*fitted)
+        except Exception as e:
+            print(f"✗ Vector index training failed: {str(e)}")
+        finally:
+            self._training = None
+
+    def _fit(self, vectors: np.ndarray, live_rows: np.ndarray, count: int, nlist: Optional[int] = None,
+             iterations: int = 10, sample_size: int = 50000) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Centroids and assignments for the first `count` rows; touches no index state"""
+        nlist = nlist or max(1, int(np.sqrt(live_rows.size)))
+
+        rng = np.random.default_rng(0)
+        sample = rng.choice(live_rows, size=min(sample_size, live_rows.size), replace=False)
+        data = np.asarray(vectors[np.sort(sample)])
+        centroids = data[rng.choice(len(data), size=min(nlist, len(data)), replace=False)].copy()
+
+        # Spherical k-means: centroids are renormalized means of their members
+        for _ in range(iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            norms = np.linalg.norm(sums, axis=1)
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+
+        centroids = centroids.astype(np.float32)
+        assignments = np.zeros(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            stop = min(start + 65536, count)
+            assignments[start:stop] = np.argmax(np.asarray(vectors[start:stop]) @ centroids.T, axis=1)
+        return centroids, assignments, int(live_rows.size)
+
+    def _install(self, centroids: np.ndarray, assignments: np.ndarray, trained_count: int):
+        """Switch to freshly fitted centroids, assigning rows added since the fit started"""
+        self._centroids = centroids
+        self._assignments = np.zeros(self._capacity, dtype=np.int32)
+        self._assignments[:len(assignments)] = assignments
+        if len(assignments) < self._count:
+            tail = slice(len(assignments), self._count)
+            self._assignments[tail] = self._nearest_centroids(self._vectors[tail])
+        self._trained_count = trained_count
+        self._lists = None
+
+    def save(self):
+        """Compact tombstoned rows when they pile up, flush vectors and persist IVF state"""
+        if self._count and self._count - self._live_count >= self.compact_ratio * self._count:
+            self.compact()
+        if self._vectors is not None:
+            self._vectors.flush()
+        if self._centroids is not None:
+            np.savez(self._ivf_path, centroids=self._centroids,
+                     assignments=self._assignments[:self._count], trained_count=self._trained_count)
+        if self._log is not None:
+            self._log.flush()
+
+    def compact(self):
+        """Rewrite the vector matrix and row log with live rows only"""
+        live_rows = np.flatnonzero(self._live[:self._count])
+        capacity = max(1024, self._capacity)
+        while capacity // 2 >= max(1024, live_rows.size):
+            capacity //= 2
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        vectors_tmp, rows_tmp = self._vectors_path + ".tmp", self._rows_path + ".tmp"
+        compacted = np.memmap(vectors_tmp, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        for start in range(0, live_rows.size, 65536):
+            batch = live_rows[start:start + 65536]
+            compacted[start:start + batch.size] = self._vectors[batch]
+        compacted.flush()
+        del compacted
+        rows = [self._rows[row] for row in live_rows]
+        with open(rows_tmp, "w", encoding="utf-8") as f:
+            for entry in rows:
+                f.write(json.dumps(entry) + "\n")
+
+        # Row numbers change, so stale IVF state must not survive a crash; load()
+        # finishes a compaction interrupted between the two renames
+        if os.path.exists(self._ivf_path):
+            os.remove(self._ivf_path)
+        del self._vectors
+        self._vectors = None
+        os.replace(vectors_tmp, self._vectors_path)
+        os.replace(rows_tmp, self._rows_path)
+
+        assignments = self._assignments[live_rows] if self._centroids is not None else None
+        self._capacity = capacity
+        self._count = 0
+        self._rows = []
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live_count = 0
+        self._url_rows = {}
+        for entry in rows:
+            self._append_row(entry)
+        if assignments is not None:
+            self._assignments = np.zeros(capacity, dtype=np.int32)
+            self._assignments[:len(assignments)] = assignments
+        self._lists = None
+        self._generation += 1
+        self._open_vectors(capacity)
+
+    def load(self) -> bool:
+        """Replay the row log and reopen the vector matrix"""
+        vectors_tmp, rows_tmp = self._vectors_path + ".tmp", self._rows_path + ".tmp"
+        if os.path.exists(rows_tmp):
+            if os.path.exists(vectors_tmp):
+                os.remove(vectors_tmp)
+                os.remove(rows_tmp)
+            else:
+                os.replace(rows_tmp, self._rows_path)
+        if not os.path.exists(self._rows_path):
+            return False
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                dim = json.load(f)["dim"]
+            if dim != self.dim:
+                raise ValueError(
+                    f"Vector index in {self.directory} has dim {dim} but the embedder produces {self.dim}; "
+                    f"delete the directory to rebuild it"
+                )
+
+        with open(self._rows_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Torn final line from an interrupted write
+                if "delete" in entry:
+                    rows = self._url_rows.pop(entry["delete"], [])
+                    self._live[rows] = False
+                    self._live_count -= len(rows)
+                else:
+                    self._reserve(self._count + 1, open_only=True)
+                    self._append_row(entry)
+        if self._capacity:
+            self._open_vectors(self._capacity)
+
+        if os.path.exists(self._ivf_path):
+            state = np.load(self._ivf_path)
+            self._centroids = state["centroids"]
+            self._trained_count = int(state["trained_count"])
+            self._assignments = np.zeros(self._capacity, dtype=np.int32)
+            saved = state["assignments"][:self._count]
+            self._assignments[:len(saved)] = saved
+            if len(saved) < self._count:
+                tail = slice(len(saved), self._count)
+                self._assignments[tail] = self._nearest_centroids(self._vectors[tail])
+        return True
+
+    def close(self):
+        self.save()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _append_row(self, entry: Dict):
+        row = self._count
+        self._rows.append(entry)
+        self._url_rows.setdefault(entry["url"], []).append(row)
+        self._live[row] = True
+        self._live_count += 1
+        self._count += 1
+
+    def _reserve(self, rows: int, open_only: bool = False):
+        """Grow the matrix (and per-row arrays) to hold at least `rows` rows"""
+        if rows <= self._capacity:
+            return
+        capacity = max(1024, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+
+        self._live = np.concatenate([self._live, np.zeros(capacity - self._capacity, dtype=bool)])
+        if self._centroids is not None:
+            self._assignments = np.concatenate(
+                [self._assignments, np.zeros(capacity - len(self._assignments), dtype=np.int32)]
+            )
+        self._capacity = capacity
+        if not open_only:
+            self._open_vectors(capacity)
+
+    def _open_vectors(self, capacity: int):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+
+        size = capacity * self.dim * 4
+        mode = "r+b" if os.path.exists(self._vectors_path) else "w+b"
+        with open(self._vectors_path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        if not os.path.exists(self._meta_path):
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim}, f)
+
+    def _log_entry(self, entry: Dict):
+        if self._log is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._log = open(self._rows_path, "a", encoding="utf-8")
+        self._log.write(json.dumps(entry) + "\n")
+        self._log.flush()
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(np.asarray(vectors) @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _maybe_train(self):
+        """Train once past the threshold, retrain when the corpus has doubled"""
+        if self._live_count < self.ivf_threshold or self._training is not None:
+            return
+        if self._centroids is None or self._live_count >= 2 * self._trained_count:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.train()
+                return
+            self._training = loop.create_task(self._train_in_background())
+
+    def _scan(self, q: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+        """Scores of every row, read as contiguous blocks; tombstoned rows score -inf"""
+        scores = np.empty(self._count, dtype=np.float32)
+        for start in range(0, self._count, block_rows):
+            stop = min(start + block_rows, self._count)
+            scores[start:stop] = self._vectors[start:stop] @ q
+        scores[~self._live[:self._count]] = -np.inf
+        return scores
+
+    def _probe(self, q: np.ndarray) -> np.ndarray:
+        """Live rows in the nprobe lists nearest to the query"""
+        if self._lists is None:
+            assignments = self._assignments[:self._count]
+            order = np.argsort(assignments, kind="stable")
+            offsets = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+            self._lists = (order, offsets)
+        order, offsets = self._lists
+
+        nearest = np.argsort(-(self._centroids @ q))[:self.nprobe]
+        rows = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in nearest])
+        return rows[self._live[rows]]
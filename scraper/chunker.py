@@ -0,0 +1,109 @@
+from typing import Dict, Iterable, List
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, else a word/punctuation estimate"""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+        except Exception:
+            self._encoding = None  # Optional dependency, or the encoding is not cached offline
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(TOKEN_PATTERN.findall(text))
+
+class TextChunker:
+    """Split sectioned page text into token-counted chunks.
+
+    Sections that fit are packed together, so chunks only break at heading
+    boundaries; a section larger than max_tokens is split into windows
+    that overlap by overlap_tokens.
+    """
+
+    def __init__(self, max_tokens: int = 256, overlap_tokens: int = 32, counter: TokenCounter = None):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.counter = counter or TokenCounter()
+
+    def chunk_sections(self, sections: List[Dict]) -> List[Dict]:
+        """Chunk [{"heading", "level", "text"}] sections into [{"position", "heading", "text", "tokens"}]"""
+        chunks: List[Dict] = []
+        pending: List[str] = []
+        pending_heading = ""
+        pending_tokens = 0
+
+        def flush():
+            nonlocal pending, pending_tokens
+            if pending:
+                chunks.append(self._chunk(len(chunks), pending_heading, "\n\n".join(pending), pending_tokens))
+            pending, pending_tokens = [], 0
+
+        for section in sections:
+            block = self._section_block(section)
+            if not block:
+                continue
+            tokens = self.counter.count(block)
+
+            if tokens > self.max_tokens:
+                flush()
+                for text, window_tokens in self._windows(block):
+                    chunks.append(self._chunk(len(chunks), section["heading"], text, window_tokens))
+                continue
+
+            if pending_tokens + tokens > self.max_tokens:
+                flush()
+            if not pending:
+                pending_heading = section["heading"]
+            pending.append(block)
+            pending_tokens += tokens
+
+        flush()
+        return chunks
+
+    def _section_block(self, section: Dict) -> str:
+        text = section["text"].strip()
+        if section["heading"]:
+            return f"{section['heading']}\n{text}".strip()
+        return text
+
+    def _windows(self, text: str) -> Iterable:
+        """Overlapping word windows of at most max_tokens tokens"""
+        words = text.split()
+        counts = [self.counter.count(word) for word in words]
+
+        start = 0
+        while start < len(words):
+            end, tokens = start, 0
+            while end < len(words) and (tokens + counts[end] <= self.max_tokens or end == start):
+                tokens += counts[end]
+                end += 1
+            yield " ".join(words[start:end]), tokens
+            if end >= len(words):
+                break
+
+            # Step back far enough to repeat ~overlap_tokens tokens
+            back, overlap = end, 0
+            while back > start + 1 and overlap + counts[back - 1] <= self.overlap_tokens:
+                back -= 1
+                overlap += counts[back]
+            start = back
+
+    def _chunk(self, position: int, heading: str, text: str, tokens: int) -> Dict:
+        return {"position": position, "heading": heading, "text": text, "tokens": tokens}
+
+def pack_chunks(chunks: Iterable[Dict], token_budget: int) -> List[Dict]:
+    """Greedily keep chunks, in the given order, that fit within the token budget"""
+    packed, used = [], 0
+    for chunk in chunks:
+        if used + chunk["tokens"] <= token_budget:
+            packed.append(chunk)
+            used += chunk["tokens"]
+    return packed
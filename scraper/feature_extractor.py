@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import re
+
+# Ordered content-type rules: the first rule matching the title wins,
+# otherwise the first rule matching the body text
+CONTENT_TYPE_RULES = [
+    ("tutorial", ("tutorial", "guide", "how to")),
+    ("documentation", ("documentation", "docs", "reference")),
+    ("article", ("news", "article", "report")),
+    ("blog_post", ("blog", "post", "opinion")),
+    ("research", ("research", "study", "analysis")),
+]
+
+WORD_PATTERN = re.compile(r"[^\W_][\w'-]*[^\W_]|[^\W_]")
+
+@dataclass(frozen=True)
+class PageFeatures:
+    """Per-page features shared by the orchestrator, storage and API"""
+    content_type: str
+    complexity_score: float
+    reading_time: int
+    word_count: int
+    key_topics: Tuple[str, ...] = field(default_factory=tuple)
+    has_code: bool = False
+
+    def to_dict(self) -> Dict:
+        """Study metadata as stored in MongoDB"""
+        return {
+            "reading_time": self.reading_time,
+            "complexity_score": self.complexity_score,
+            "content_type": self.content_type,
+            "key_topics": list(self.key_topics),
+            "word_count": self.word_count,
+            "has_code": self.has_code
+        }
+
+class FeatureExtractor:
+    def __init__(self, max_topics: int = 10):
+        self.max_topics = max_topics
+
+    def extract_features(self, extracted_data: Dict, key_topics: Optional[Tuple[str, ...]] = None) -> PageFeatures:
+        """Compute page features in a single pass over the extracted text
+
+        key_topics from the NLP topic stage take precedence; without them
+        topics come from the title/heading heuristic.
+        """
+        title = extracted_data["metadata"]["title"].lower()
+        text = extracted_data["text_summary"].lower()
+        words = text.split()
+
+        return PageFeatures(
+            content_type=self._identify_content_type(title, text),
+            complexity_score=self._calculate_complexity_score(extracted_data),
+            reading_time=max(1, len(words) // 250),
+            word_count=len(words),
+            key_topics=key_topics if key_topics else self._extract_key_topics(extracted_data),
+            has_code="code" in text
+        )
+
+    def _identify_content_type(self, title: str, text: str) -> str:
+        """Identify content type from lowercased title, then body text"""
+        for source in (title, text):
+            for content_type, keywords in CONTENT_TYPE_RULES:
+                if any(keyword in source for keyword in keywords):
+                    return content_type
+        return "general"
+
+    def _calculate_complexity_score(self, data: Dict) -> float:
+        """Calculate content complexity for LLM processing hints"""
+        score = 0.0
+
+        # Text length factor
+        score += min(len(data["text_summary"]) / 1000, 5.0)
+
+        # Structure complexity
+        score += min(len(data["content"]) / 10, 3.0)
+
+        # Link density
+        score += min(len(data["links"]) / 20, 2.0)
+
+        return round(score, 2)
+
+    def _extract_key_topics(self, data: Dict) -> Tuple[str, ...]:
+        """Extract key topics from title and headings, in order of appearance"""
+        sources = [data["metadata"]["title"]]
+        sources.extend(heading["text"] for heading in data["metadata"]["headings"])
+
+        topics: Dict[str, None] = {}
+        for source in sources:
+            for word in WORD_PATTERN.findall(source.lower()):
+                if len(word) > 3:
+                    topics.setdefault(word)
+                    if len(topics) >= self.max_topics:
+                        return tuple(topics)
+        return tuple(topics)
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import hashlib
+import re
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# 64-bit SimHash split into 4 bands of 16 bits: two fingerprints within
+# Hamming distance 3 always agree on at least one band
+SIMHASH_BITS = 64
+BAND_COUNT = 4
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+NEAR_DUPLICATE_DISTANCE = 3
+
+# Below this many words (empty renders, JS shells) pages all look alike,
+# so they are never matched as duplicates
+MIN_DEDUP_WORDS = 50
+
+@dataclass(frozen=True)
+class ContentFingerprint:
+    """Exact and near-duplicate fingerprints of a page's normalized text"""
+    exact_hash: str
+    simhash: int
+    word_count: int = 0
+
+    @property
+    def dedupable(self) -> bool:
+        return self.word_count >= MIN_DEDUP_WORDS
+
+    @property
+    def bands(self) -> Tuple[int, ...]:
+        """Band keys for candidate lookup; the band index is folded into each key"""
+        mask = (1 << BAND_BITS) - 1
+        return tuple(
+            (band << BAND_BITS) | ((self.simhash >> (band * BAND_BITS)) & mask)
+            for band in range(BAND_COUNT)
+        )
+
+    def distance(self, simhash: int) -> int:
+        return bin(self.simhash ^ simhash).count("1")
+
+    def to_dict(self) -> dict:
+        """Fingerprint fields as stored in MongoDB (int64-safe)"""
+        return {
+            "exact": self.exact_hash,
+            "simhash": to_signed64(self.simhash),
+            "bands": list(self.bands),
+            "words": self.word_count
+        }
+
+def to_signed64(value: int) -> int:
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercased word sequence; punctuation and spacing differences vanish"""
+    return WORD_PATTERN.findall(text.lower())
+
+def fingerprint_text(text: str, shingle_size: int = 3) -> ContentFingerprint:
+    """Compute the exact hash and SimHash of a page's text"""
+    words = normalize_words(text)
+    exact_hash = hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest()
+
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles
+    )
+    # One row of 64 bits per shingle, least significant bit first, then +1/-1 votes per column
+    values = np.frombuffer(digests, dtype=">u8").astype("<u8")
+    bits = np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    weights = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+
+    simhash = 0
+    for bit in np.flatnonzero(weights > 0):
+        simhash |= 1 << int(bit)
+
+    return ContentFingerprint(exact_hash=exact_hash, simhash=simhash, word_count=len(words))
+
+def fingerprint_sections(sections: List[Dict], shingle_size: int = 3) -> ContentFingerprint:
+    """Fingerprint a page's full section text rather than its truncated summary"""
+    return fingerprint_text(
+        " ".join(f"{section['heading']} {section['text']}" for section in sections), shingle_size
+    )
@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+
+# Only what noun chunks and entities need
+REQUIRED_PIPES = ("tok2vec", "tagger", "attribute_ruler", "parser", "ner")
+
+# Standard components we never use; excluded so they are not even loaded
+EXCLUDED_PIPES = ("lemmatizer", "trainable_lemmatizer", "senter", "morphologizer", "textcat",
+                  "textcat_multilabel", "entity_linker", "entity_ruler", "span_finder", "spancat")
+
+# Entity labels that make poor topics
+SKIPPED_ENTITY_LABELS = {"DATE", "TIME", "PERCENT", "MONEY", "QUANTITY", "ORDINAL", "CARDINAL"}
+
+_models: Dict[str, object] = {}
+
+def load_spacy_model(name: str):
+    """Load a spaCy pipeline once per process, keeping only REQUIRED_PIPES enabled"""
+    nlp = _models.get(name)
+    if nlp is None:
+        import spacy
+        nlp = spacy.load(name, exclude=list(EXCLUDED_PIPES))
+        # Custom components outside both lists are loaded but kept out of the way
+        for pipe in nlp.pipe_names:
+            if pipe not in REQUIRED_PIPES:
+                nlp.disable_pipe(pipe)
+        _models[name] = nlp
+    return nlp
+
+class SpacyTopicExtractor:
+    """Keyphrases from noun chunks and named entities, scored per page.
+
+    Phrases are weighted by frequency, tripled when they occur in the title
+    or headings, and boosted when they are entities. Ties keep document
+    order, so results are deterministic.
+    """
+
+    def __init__(self, model: str = "en_core_web_sm", max_topics: int = 10, max_chars: int = 5000,
+                 batch_size: int = 32):
+        self.nlp = load_spacy_model(model)
+        self.max_topics = max_topics
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+
+    def extract_batch(self, pages: List[Dict]) -> List[Tuple[str, ...]]:
+        """Topics for each extracted page, running the pipeline once over all of them"""
+        texts, head_lengths = [], []
+        for data in pages:
+            head = "\n".join(
+                [data["metadata"]["title"]] + [heading["text"] for heading in data["metadata"]["headings"]]
+            ) + "\n\n"
+            texts.append(head + data["text_summary"][:self.max_chars])
+            head_lengths.append(len(head))
+        return [
+            self._topics(doc, head_length)
+            for doc, head_length in zip(self.nlp.pipe(texts, batch_size=self.batch_size), head_lengths)
+        ]
+
+    def _topics(self, doc, head_length: int) -> Tuple[str, ...]:
+        scores: Dict[str, float] = {}
+        for span, weight in self._candidates(doc):
+            phrase = _normalize(span)
+            if phrase:
+                boost = 3.0 if span.start_char < head_length else 1.0
+                scores[phrase] = scores.get(phrase, 0.0) + weight * boost
+        # sorted() is stable, so equal scores keep first-occurrence order
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return tuple(ranked[:self.max_topics])
+
+    def _candidates(self, doc):
+        spans = [(chunk, 1.0) for chunk in doc.noun_chunks]
+        spans.extend((entity, 1.5) for entity in doc.ents if entity.label_ not in SKIPPED_ENTITY_LABELS)
+        spans.sort(key=lambda item: item[0].start)
+        return spans
+
+def _normalize(span) -> Optional[str]:
+    """Lowercased phrase without leading determiners/stop words, or None if nothing is left"""
+    tokens = [token for token in span if not token.is_punct and not token.is_space]
+    while tokens and (tokens[0].is_stop or tokens[0].pos_ in ("DET", "PRON")):
+        tokens.pop(0)
+    if not tokens or all(token.is_stop or token.like_num for token in tokens):
+        return None
+    phrase = " ".join(token.norm_ for token in tokens)
+    return phrase if len(phrase) > 3 else None
+
+class TopicBatcher:
+    """Collects pages from concurrent pipelines into one nlp.pipe call.
+
+    A batch runs when batch_size pages are waiting or max_wait seconds
+    after the first one arrived, in a thread so the event loop keeps
+    loading pages. Batches run one at a time against the shared model.
+    """
+
+    def __init__(self, extractor: SpacyTopicExtractor, batch_size: int = 16, max_wait: float = 0.05):
+        self.extractor = extractor
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def extract(self, extracted_data: Dict) -> Optional[Tuple[str, ...]]:
+        """Topics for one page; None if extraction failed"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((extracted_data, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict, asyncio.Future]]):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        try:
+            async with self._lock:
+                topics = await asyncio.to_thread(self.extractor.extract_batch, [data for data, _ in batch])
+        except Exception as e:
+            print(f"✗ Topic extraction failed for {len(batch)} pages: {str(e)}")
+            topics = [None] * len(batch)
+        for (_, future), page_topics in zip(batch, topics):
+            if not future.done():
+                future.set_result(page_topics)
+
+def load_topic_batcher(spec: str = "spacy:en_core_web_sm", max_topics: int = 10) -> Optional[TopicBatcher]:
+    """TopicBatcher for "spacy:<model>"; None for "heuristic" or when spaCy is unavailable"""
+    kind, _, model = spec.partition(":")
+    if kind == "heuristic":
+        return None
+    if kind != "spacy":
+        raise ValueError(f"Unknown topic extractor: {spec}")
+    try:
+        extractor = SpacyTopicExtractor(model or "en_core_web_sm", max_topics=max_topics)
+    except (ImportError, OSError) as e:
+        print(
+            f"✗ spaCy model {model or 'en_core_web_sm'} unavailable, FALLING BACK TO HEURISTIC TOPICS: {str(e)}\n"
+            f"  Install it with: python -m spacy download {model or 'en_core_web_sm'}"
+        )
+        return None
+    return TopicBatcher(extractor)
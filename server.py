@@ -1,32 +1,117 @@
-import gradio as gr
-import asyncio
-from main import WebScrapingOrchestrator
-
-orchestrator = WebScrapingOrchestrator()
-
-async def scrape_async(url):
-    result = await orchestrator.process_url(url)
-    if "error" in result:
-        return f"❌ Error: {result['error']}"
-    return {
-        "URL": result.get("url"),
-        "Title": result.get("title"),
-        "Text Length": result["summary"]["text_length"],
-        "Headings": result["llm_ready_data"]["key_headings"],
-        "Main Topics": result["llm_ready_data"]["main_topics"],
-        "Summary (Short)": result["llm_ready_data"]["text_summary"][:800] + "..."
-    }
-
-def scrape(url):
-    return asyncio.run(scrape_async(url))
-
-with gr.Blocks(title="MCP Web Scraper") as demo:
-    gr.Markdown("### 🔍 MCP LLM Web Scraper")
-    url_input = gr.Textbox(label="Enter a webpage URL", placeholder="https://...")
-    output = gr.JSON(label="Scraped & LLM-ready Content")
-
-    scrape_button = gr.Button("Scrape Page")
-    scrape_button.click(scrape, inputs=url_input, outputs=output)
-
-if __name__ == "__main__":
-    demo.launch(server_name="0.0.0.0", server_port=7860)
+import gradio as gr
+import asyncio
+import atexit
+import time
+from main import WebScrapingOrchestrator
+from scraper.html_loader import HTMLLoader
+from config.settings import settings
+
+orchestrator = WebScrapingOrchestrator()
+
+# Pages scraped at once; further clicks wait in Gradio's queue
+CONCURRENCY = getattr(settings.scraping, "ui_concurrency", 4)
+QUEUE_SIZE = getattr(settings.scraping, "ui_queue_size", 64)
+
+_started = False
+_startup_lock = None
+_loop = None
+
+async def ensure_started():
+    """Start storage and one shared browser on Gradio's event loop, once"""
+    global _started, _startup_lock, _loop
+    if _started:
+        return
+    if _startup_lock is None:
+        _startup_lock = asyncio.Lock()
+    async with _startup_lock:
+        if _started:
+            return
+        await orchestrator.startup()
+        orchestrator.html_loader = await HTMLLoader().start()
+        _loop = asyncio.get_running_loop()
+        _started = True
+
+async def _close():
+    loader, orchestrator.html_loader = orchestrator.html_loader, None
+    if loader is not None:
+        await loader.close()
+    await orchestrator.close_connections()
+
+def shutdown():
+    """Close the shared browser and storage on the loop they were started on, once"""
+    global _started
+    if not _started:
+        return
+    _started = False
+    try:
+        if _loop.is_running():
+            asyncio.run_coroutine_threadsafe(_close(), _loop).result(timeout=30)
+        else:
+            asyncio.run(_close())
+        print("✓ Scraper shut down")
+    except Exception as e:
+        print(f"✗ Shutdown failed: {str(e)}")
+
+# demo.unload fires per browser session, so process exit is the hook for shared resources
+atexit.register(shutdown)
+
+async def scrape(url):
+    """Scrape a page, yielding the view after every pipeline stage"""
+    await ensure_started()
+
+    view = {"URL": url, "Status": "Loading page..."}
+    yield view
+
+    async for event in orchestrator.process_url_stages(url):
+        stage, data = event["stage"], event["data"]
+        timing = f"{event['stage_ms']:.0f} ms"
+
+        if stage == "error":
+            yield f"❌ Error: {data['error']}"
+            return
+        if stage == "loaded":
+            view.update({"URL": data["url"], "Title": data["title"], "Status": f"Loaded ({timing}), extracting..."})
+        elif stage == "extracted":
+            view.update({
+                "Text Length": data["text_length"],
+                "Headings": [heading["text"] for heading in data["headings"][:5]],
+                "Status": f"Extracted ({timing}), analyzing..."
+            })
+        elif stage == "duplicate":
+            view.update({"Duplicate Of": data["duplicate_of"]})
+        elif stage == "analyzed":
+            view.update({
+                "Main Topics": data["key_topics"],
+                "Content Type": data["summary"]["content_type"],
+                "Chunks": data["summary"]["chunks"],
+                "Status": f"Analyzed ({timing}), storing..."
+            })
+        elif stage == "done":
+            if "llm_ready_data" in data:
+                view["Summary (Short)"] = data["llm_ready_data"]["text_summary"][:800] + "..."
+            view["Status"] = f"Done in {event['elapsed_ms'] / 1000:.1f} s"
+        else:
+            continue
+        yield dict(view)
+
+with gr.Blocks(title="MCP Web Scraper") as demo:
+    gr.Markdown("### 🔍 MCP LLM Web Scraper")
+    url_input = gr.Textbox(label="Enter a webpage URL", placeholder="https://...")
+    output = gr.JSON(label="Scraped & LLM-ready Content")
+
+    scrape_button = gr.Button("Scrape Page")
+    scrape_button.click(scrape, inputs=url_input, outputs=output, concurrency_limit=CONCURRENCY)
+
+demo.queue(max_size=QUEUE_SIZE, default_concurrency_limit=CONCURRENCY)
+
+if __name__ == "__main__":
+    demo.launch(server_name="0.0.0.0", server_port=7860, prevent_thread_lock=True)
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Close while Gradio's loop is still serving, then stop the server
+        shutdown()
+        demo.close()
@@ -0,0 +1,162 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import datetime
+from config.settings import settings
+from scraper.feature_extractor import PageFeatures
+from scraper.fingerprint import ContentFingerprint
+from storage.mongo_storage import (
+    MongoStorage,
+    PAGE_INDEXES,
+    BLOB_INDEXES,
+    CHUNK_INDEXES,
+    CHUNK_PROJECTION,
+    HISTORY_INDEXES,
+    HISTORY_PROJECTION,
+    PAGE_PROJECTION,
+    DOMAIN_LISTING_PROJECTION,
+    MAX_ALIAS_HOPS,
+    pool_options,
+)
+from storage.bulk_writer import BulkWriter
+
+class AsyncMongoStorage(MongoStorage):
+    """Motor-backed MongoStorage for use inside the event loop"""
+
+    def __init__(self):
+        self.client = AsyncIOMotorClient(settings.database.mongo_uri, **pool_options())
+        self.db = self.client[settings.database.mongo_db]
+        self.collection = self.db.scraped_pages
+        self.blobs = self.db.page_blobs
+        self.chunks = self.db.page_chunks
+        self.history = self.db.crawl_history
+        self.writer = self._bulk_writer(self.collection)
+        self.blob_writer = self._bulk_writer(self.blobs)
+        self.chunk_writer = self._bulk_writer(self.chunks)
+
+    def _bulk_writer(self, collection) -> BulkWriter:
+        return BulkWriter(
+            collection,
+            max_ops=getattr(settings.database, "mongo_bulk_max_ops", 500),
+            max_bytes=getattr(settings.database, "mongo_bulk_max_bytes", 8 * 1024 * 1024),
+            max_age=getattr(settings.database, "mongo_bulk_max_age", 0.25)
+        )
+
+    async def ensure_indexes(self):
+        """Create indexes; call once the event loop is running"""
+        for keys, options in PAGE_INDEXES:
+            await self.collection.create_index(keys, **options)
+        for keys, options in BLOB_INDEXES:
+            await self.blobs.create_index(keys, **options)
+        for keys, options in CHUNK_INDEXES:
+            await self.chunks.create_index(keys, **options)
+        for keys, options in HISTORY_INDEXES:
+            await self.history.create_index(keys, **options)
+
+    async def store_page_data(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures,
+                              fingerprint: ContentFingerprint, chunks: List[Dict]) -> str:
+        """Store page data and wait until it is durable, flushing instead of waiting out max_age"""
+        write = self.queue_page_data(url, extracted_data, dom_structure, features, fingerprint, chunks)
+        await self.flush()
+        return await write
+
+    def queue_page_data(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures,
+                        fingerprint: ContentFingerprint, chunks: List[Dict]) -> asyncio.Future:
+        """Buffer a page upsert without waiting; the future carries its id or error"""
+        document, blob, chunk_document = self._build_documents(
+            url, extracted_data, dom_structure, features, fingerprint, chunks
+        )
+        return asyncio.ensure_future(self._await_all(
+            self.writer.submit({"url": url}, document),
+            self.blob_writer.submit({"url": url}, blob),
+            self.chunk_writer.submit({"url": url}, chunk_document)
+        ))
+
+    async def store_alias(self, url: str, canonical_url: str, extracted_data: Dict) -> str:
+        """Store a duplicate page as an alias and wait until it is durable"""
+        write = self.queue_alias(url, canonical_url, extracted_data)
+        await self.flush()
+        return await write
+
+    def queue_alias(self, url: str, canonical_url: str, extracted_data: Dict) -> asyncio.Future:
+        """Buffer an alias upsert without waiting; a formerly canonical URL loses its blob and chunks"""
+        return asyncio.ensure_future(self._await_all(
+            self.writer.submit({"url": url}, self._build_alias(url, canonical_url, extracted_data)),
+            # Through the writers, so a buffered blob or chunk upsert cannot land after the delete
+            self.blob_writer.delete({"url": url}),
+            self.chunk_writer.delete({"url": url})
+        ))
+
+    async def find_duplicate(self, fingerprint: ContentFingerprint, url: str) -> Optional[str]:
+        """Return the canonical URL whose content matches this fingerprint, if any"""
+        if not fingerprint.dedupable:
+            return None
+        cursor = self.collection.find(
+            self._duplicate_filter(fingerprint, url), {"_id": 0, "url": 1, "fingerprint": 1}
+        ).limit(50)
+        return self._pick_canonical(fingerprint, await cursor.to_list(length=50))
+
+    async def _await_all(self, document_write: asyncio.Future, *related_writes: asyncio.Future) -> str:
+        document_id, *_ = await asyncio.gather(document_write, *related_writes)
+        return document_id
+
+    async def flush(self):
+        """Write all buffered page upserts"""
+        await asyncio.gather(self.writer.flush(), self.blob_writer.flush(), self.chunk_writer.flush())
+
+    async def get_page_data(self, url: str, projection: Dict = PAGE_PROJECTION) -> Optional[Dict]:
+        """Retrieve the hot page document by URL, following duplicate aliases"""
+        for _ in range(MAX_ALIAS_HOPS + 1):
+            document = await self.collection.find_one({"url": url}, {**projection, "alias_of": 1})
+            if not document or "alias_of" not in document:
+                return document
+            url = document["alias_of"]
+        return None
+
+    async def get_page_chunks(self, urls: List[str]) -> Dict[str, List[Dict]]:
+        """Stored chunks for each URL"""
+        cursor = self.chunks.find({"url": {"$in": urls}}, CHUNK_PROJECTION)
+        return {document["url"]: document["chunks"] for document in await cursor.to_list(length=len(urls))}
+
+    async def iter_page_chunks(self, batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Stream every page's chunk document"""
+        async for document in self.chunks.find({}, CHUNK_PROJECTION, batch_size=batch_size):
+            yield document
+
+    async def get_page_blob(self, url: str) -> Optional[Dict]:
+        """Retrieve the cold content blocks and DOM analysis for a page"""
+        return self._decode_blob(await self.blobs.find_one({"url": url}, {"_id": 0, "codec": 1, "data": 1}))
+
+    async def get_pages_by_domain(self, domain: str, after: Optional[str] = None, limit: int = 50,
+                                  projection: Dict = DOMAIN_LISTING_PROJECTION) -> Tuple[List[Dict], Optional[str]]:
+        """Get one keyset page of a domain's pages, ordered by URL"""
+        cursor = self.collection.find(
+            self._domain_filter(domain, after), projection
+        ).sort("url", 1).limit(limit)
+        return self._keyset_page(await cursor.to_list(length=limit), limit)
+
+    async def get_pages_by_urls(self, urls: List[str], projection: Dict = PAGE_PROJECTION) -> List[Dict]:
+        """Fetch pages for ranked URLs, preserving the given order"""
+        cursor = self.collection.find({"url": {"$in": urls}}, projection)
+        return self._order_by_urls(urls, await cursor.to_list(length=len(urls)))
+
+    async def iter_pages(self, projection: Dict, query: Optional[Dict] = None, batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Stream matching pages with a projection, without loading them all"""
+        async for document in self.collection.find(query or {}, projection, batch_size=batch_size):
+            yield document
+
+    async def record_visit(self, url: str, exact_hash: str):
+        """Record a fetch of `url` and whether its content hash changed since the last one"""
+        await self.history.update_one(
+            {"url": url}, self._visit_update(exact_hash, datetime.datetime.utcnow()), upsert=True
+        )
+
+    async def iter_history(self, batch_size: int = 1000) -> AsyncIterator[Dict]:
+        """Stream every URL's visit counters for recrawl planning"""
+        async for document in self.history.find({}, HISTORY_PROJECTION, batch_size=batch_size):
+            yield document
+
+    async def close(self):
+        """Flush buffered writes and close database connection"""
+        await asyncio.gather(self.writer.close(), self.blob_writer.close(), self.chunk_writer.close())
+        self.client.close()
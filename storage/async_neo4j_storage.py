@@ -0,0 +1,67 @@
+from neo4j import AsyncGraphDatabase
+from typing import Dict, List, Optional
+from config.settings import settings
+from scraper.feature_extractor import PageFeatures
+from storage.neo4j_storage import (
+    Neo4jStorage,
+    SCHEMA_STATEMENTS,
+    WRITE_PAGES_QUERIES,
+    PAGE_RELATIONSHIPS_QUERY,
+    RELATED_PAGES_QUERY,
+    driver_options,
+)
+
+class AsyncNeo4jStorage(Neo4jStorage):
+    """Async-driver Neo4jStorage for use inside the event loop"""
+
+    def __init__(self):
+        self.driver = AsyncGraphDatabase.driver(settings.database.neo4j_uri, **driver_options())
+        self.batch_size = getattr(settings.database, "neo4j_write_batch_size", 100)
+
+    async def ensure_constraints(self):
+        """Create constraints; call once the event loop is running"""
+        async with self.driver.session() as session:
+            try:
+                for statement in SCHEMA_STATEMENTS:
+                    await session.run(statement)
+            except Exception as e:
+                pass  # Constraints might already exist
+
+    async def store_relationships(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures):
+        """Store page relationships and structure in one write transaction"""
+        await self.store_relationships_batch([self.build_page_params(url, extracted_data, dom_structure, features)])
+
+    async def store_relationships_batch(self, pages: List[Dict]):
+        """Store many pages' relationships, batch_size pages per write transaction"""
+        async with self.driver.session() as session:
+            for start in range(0, len(pages), self.batch_size):
+                await session.execute_write(self._write_pages_async, pages[start:start + self.batch_size])
+
+    @staticmethod
+    async def _write_pages_async(tx, pages: List[Dict]):
+        for query in WRITE_PAGES_QUERIES:
+            result = await tx.run(query, pages=pages)
+            await result.consume()
+
+    async def get_page_relationships(self, url: str) -> Dict:
+        """Get all relationships for a page for LLM context"""
+        return (await self.get_page_relationships_batch([url])).get(url, {})
+
+    async def get_page_relationships_batch(self, urls: List[str], limits: Optional[Dict[str, int]] = None,
+                                           cursor: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+        """Relationships for many pages in one query, keyed by URL; unknown URLs are omitted"""
+        if not urls:
+            return {}
+        async with self.driver.session() as session:
+            result = await session.run(PAGE_RELATIONSHIPS_QUERY, self._relationship_params(urls, limits, cursor))
+            return {record["url"]: self._page_relationships_from_record(record, cursor) async for record in result}
+
+    async def get_related_pages(self, url: str, limit: int = 5) -> List[Dict]:
+        """Find related pages for LLM context and study suggestions"""
+        async with self.driver.session() as session:
+            result = await session.run(RELATED_PAGES_QUERY, {"url": url, "limit": limit})
+            return [dict(record) async for record in result]
+
+    async def close(self):
+        """Close database connection"""
+        await self.driver.close()
@@ -0,0 +1,27 @@
+from typing import Dict, Tuple
+import zlib
+import bson
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+def compress_blob(data: Dict, level: int = 3) -> Tuple[str, bytes]:
+    """BSON-encode and compress a cold document; returns (codec, payload)"""
+    raw = bson.encode(data)
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=level).compress(raw)
+    return "zlib", zlib.compress(raw, level)
+
+def decompress_blob(codec: str, payload: bytes) -> Dict:
+    """Inverse of compress_blob"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed blobs")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == "zlib":
+        raw = zlib.decompress(payload)
+    else:
+        raise ValueError(f"Unknown blob codec: {codec}")
+    return bson.decode(raw)
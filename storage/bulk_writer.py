@@ -0,0 +1,135 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple, Union
+import bson
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError, WriteError
+
+class BulkWriter:
+    """Write-behind buffer that flushes upserts and deletes with unordered bulk_write.
+
+    Operations are buffered until max_ops operations, max_bytes of BSON or
+    max_age seconds have accumulated. Every submitted operation gets a
+    future resolved with its stored id or failed with its own write error.
+    An unordered bulk_write does not keep submission order, so a newer
+    operation on a buffered key replaces the older one, whose future
+    then shares the newer one's outcome.
+    """
+
+    def __init__(self, collection, max_ops: int = 500, max_bytes: int = 8 * 1024 * 1024, max_age: float = 0.25):
+        self.collection = collection
+        self.max_ops = max_ops
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._pending: List[Tuple[Union[ReplaceOne, DeleteOne], asyncio.Future]] = []
+        self._pending_keys: Dict[Tuple, int] = {}
+        self._pending_bytes = 0
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+    def submit(self, key: Dict, document: Dict) -> asyncio.Future:
+        """Buffer an upsert and return a future for its outcome"""
+        return self._buffer(key, ReplaceOne(key, document, upsert=True), len(bson.encode(document)))
+
+    def delete(self, key: Dict) -> asyncio.Future:
+        """Buffer a delete of the document matching key"""
+        return self._buffer(key, DeleteOne(key), 0)
+
+    def _buffer(self, key: Dict, op: Union[ReplaceOne, DeleteOne], size: int) -> asyncio.Future:
+        if self._closed:
+            raise RuntimeError("BulkWriter is closed")
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._report_failure)
+        key = tuple(sorted(key.items()))
+        index = self._pending_keys.get(key)
+        if index is None:
+            self._pending_keys[key] = len(self._pending)
+            self._pending.append((op, future))
+        else:
+            _, replaced = self._pending[index]
+            self._pending[index] = (op, future)
+            future.add_done_callback(lambda done: _copy_outcome(done, replaced))
+        self._pending_bytes += size
+
+        if len(self._pending) >= self.max_ops or self._pending_bytes >= self.max_bytes:
+            self._spawn(self.flush())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_after_age())
+        return future
+
+    async def flush(self):
+        """Write everything buffered so far"""
+        async with self._flush_lock:
+            if self._timer is not None and self._timer is not asyncio.current_task():
+                self._timer.cancel()
+            self._timer = None
+
+            batch, self._pending = self._pending, []
+            self._pending_keys = {}
+            self._pending_bytes = 0
+            if batch:
+                await self._write(batch)
+
+    async def close(self):
+        """Flush remaining upserts and refuse new ones"""
+        self._closed = True
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _flush_after_age(self):
+        await asyncio.sleep(self.max_age)
+        await self.flush()
+
+    async def _write(self, batch: List[Tuple[Union[ReplaceOne, DeleteOne], asyncio.Future]]):
+        """Run one unordered bulk_write and resolve each item's future"""
+        try:
+            result = await self.collection.bulk_write([op for op, _ in batch], ordered=False)
+            upserted = result.upserted_ids
+            errors = {}
+        except BulkWriteError as e:
+            upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+            errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                error = errors[index]
+                future.set_exception(WriteError(error.get("errmsg", "write failed"), error.get("code"), error))
+            else:
+                # Same convention as replace_one: upserted id, else matched count
+                future.set_result(str(upserted.get(index, 1)))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _report_failure(self, future: asyncio.Future):
+        """Log failed writes so fire-and-forget failures are never silent"""
+        if not future.cancelled() and future.exception() is not None:
+            print(f"✗ Buffered write failed: {future.exception()}")
+
+def _copy_outcome(source: asyncio.Future, target: asyncio.Future):
+    """Resolve a replaced operation's future like the one that replaced it"""
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,123 @@
+"""Stream stored pages out of MongoDB as JSONL or Parquet.
+
+    python -m storage.export --format jsonl --out pages.jsonl [--domain example.com]
+    python -m storage.export --format parquet --out pages.parquet
+
+The cursor is iterated with a projection and a fixed batch size, so memory
+stays constant regardless of corpus size.
+"""
+import argparse
+import datetime
+import json
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+from storage.mongo_storage import MongoStorage, EXPORT_PROJECTION, CANONICAL_PAGES
+
+PARQUET_COLUMNS = [
+    "url", "domain", "timestamp", "title", "description", "text",
+    "headings", "content_type", "complexity_score", "reading_time", "key_topics"
+]
+
+def export_record(document: Dict) -> Dict:
+    """Flatten a projected page document into one dataset row"""
+    content = document.get("content", {})
+    metadata = document.get("study_metadata", {})
+    timestamp = document.get("timestamp")
+
+    return {
+        "url": document["url"],
+        "domain": document.get("domain", ""),
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime.datetime) else timestamp,
+        "title": document.get("title", ""),
+        "description": document.get("description", ""),
+        "text": content.get("text_summary", ""),
+        "headings": [heading["text"] for heading in content.get("headings", [])],
+        "content_type": metadata.get("content_type", "general"),
+        "complexity_score": metadata.get("complexity_score", 0.0),
+        "reading_time": metadata.get("reading_time", 0),
+        "key_topics": list(metadata.get("key_topics", []))
+    }
+
+def export_query(domain: Optional[str] = None) -> Dict:
+    """Canonical pages, optionally restricted to one domain; aliases carry no content"""
+    query = dict(CANONICAL_PAGES)
+    if domain:
+        query["domain"] = domain
+    return query
+
+def iter_ndjson(documents: Iterable[Dict]) -> Iterator[str]:
+    """Encode documents as NDJSON lines"""
+    for document in documents:
+        yield json.dumps(export_record(document), ensure_ascii=False) + "\n"
+
+def write_jsonl(documents: Iterable[Dict], out: TextIO) -> int:
+    count = 0
+    for line in iter_ndjson(documents):
+        out.write(line)
+        count += 1
+    return count
+
+def write_parquet(documents: Iterable[Dict], path: str, row_group_size: int = 5000) -> int:
+    """Write documents to Parquet one row group at a time"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("url", pa.string()),
+        ("domain", pa.string()),
+        ("timestamp", pa.string()),
+        ("title", pa.string()),
+        ("description", pa.string()),
+        ("text", pa.string()),
+        ("headings", pa.list_(pa.string())),
+        ("content_type", pa.string()),
+        ("complexity_score", pa.float64()),
+        ("reading_time", pa.int64()),
+        ("key_topics", pa.list_(pa.string())),
+    ])
+
+    count = 0
+    records = (export_record(document) for document in documents)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        while True:
+            batch: List[Dict] = list(islice(records, row_group_size))
+            if not batch:
+                break
+            columns = {name: [row[name] for row in batch] for name in PARQUET_COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            count += len(batch)
+    return count
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export stored pages for LLM dataset building")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--out", default="-", help="output path ('-' for stdout, jsonl only)")
+    parser.add_argument("--domain", help="only export pages from this domain")
+    parser.add_argument("--batch-size", type=int, default=500, help="cursor batch size")
+    args = parser.parse_args(argv)
+
+    storage = MongoStorage()
+    try:
+        documents = storage.iter_pages(EXPORT_PROJECTION, export_query(args.domain), args.batch_size)
+
+        if args.format == "parquet":
+            if args.out == "-":
+                parser.error("--out is required for parquet")
+            count = write_parquet(documents, args.out)
+        elif args.out == "-":
+            count = write_jsonl(documents, sys.stdout)
+        else:
+            with open(args.out, "w", encoding="utf-8") as out:
+                count = write_jsonl(documents, out)
+    finally:
+        storage.close()
+
+    print(f"✓ Exported {count} pages", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS graph_ingest (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL UNIQUE,
+        params TEXT NOT NULL,
+        enqueued_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt REAL NOT NULL DEFAULT 0,
+        last_error TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS graph_dead_letter (
+        url TEXT PRIMARY KEY,
+        params TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        last_error TEXT,
+        failed_at REAL NOT NULL
+    )
+    """,
+]
+
+# Failures of Neo4j itself rather than of particular pages; a batch failing
+# with one of these is retried whole instead of being bisected
+TRANSIENT_ERRORS = (ServiceUnavailable, SessionExpired, TransientError, OSError)
+
+class GraphIngestQueue:
+    """Durable SQLite queue of pending Neo4j page writes.
+
+    Producers enqueue build_page_params dicts and return immediately; a
+    background consumer (run) drains the queue in large batched
+    transactions. Re-enqueueing a URL replaces its pending entry, so only
+    the latest version of a page is written.
+
+    A batch that fails because Neo4j is unavailable is retried whole with
+    exponential backoff. Any other failure is bisected, so the good pages
+    are written and only the failing ones back off; a page failing
+    max_attempts times moves to the graph_dead_letter table. The consumer
+    runs its SQLite calls in threads so a busy file never blocks the loop.
+    """
+
+    def __init__(self, path: str = "data/graph_queue.db", batch_size: int = 500,
+                 poll_interval: float = 1.0, max_backoff: float = 300.0, lease_timeout: float = 120.0,
+                 max_attempts: int = 8):
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._written = 0
+        self._last_write: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    def enqueue(self, pages: List[Dict]):
+        """Queue page params for the graph; replaces any pending entry per URL"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO graph_ingest (url, params, enqueued_at) VALUES (?, ?, ?)",
+                [(page["url"], json.dumps(page), now) for page in pages]
+            )
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def claim(self) -> List[Tuple[int, int, Dict]]:
+        """Lease the oldest due entries, up to batch_size, as (id, attempts, params)
+
+        Claimed entries are pushed lease_timeout into the future, so several
+        processes can drain one queue file; entries whose consumer died
+        become due again once the lease runs out.
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            rows = self._db.execute(
+                "SELECT id, attempts, params FROM graph_ingest WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, self.batch_size)
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE graph_ingest SET next_attempt = ? WHERE id = ?",
+                [(now + self.lease_timeout, row_id) for row_id, _, _ in rows]
+            )
+        return [(row_id, attempts, json.loads(params)) for row_id, attempts, params in rows]
+
+    def ack(self, ids: List[int]):
+        """Remove written entries; a newer version of the same URL keeps its own id"""
+        with self._lock:
+            self._db.executemany("DELETE FROM graph_ingest WHERE id = ?", [(row_id,) for row_id in ids])
+        self._written += len(ids)
+        self._last_write = time.time()
+        self._last_error = None
+
+    def retry_later(self, ids: List[int], error: str):
+        """Back off failed entries exponentially by attempt count"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE graph_ingest SET attempts = attempts + 1, last_error = ?, "
+                "next_attempt = ? + MIN(?, (1 << MIN(attempts, 16))) WHERE id = ?",
+                [(error, now, self.max_backoff, row_id) for row_id in ids]
+            )
+        self._last_error = error
+
+    def dead_letter(self, row_id: int, error: str):
+        """Move an entry that keeps failing out of the queue"""
+        with self._lock, self._transaction():
+            self._db.execute(
+                "INSERT OR REPLACE INTO graph_dead_letter (url, params, attempts, last_error, failed_at) "
+                "SELECT url, params, attempts + 1, ?, ? FROM graph_ingest WHERE id = ?",
+                (error, time.time(), row_id)
+            )
+            self._db.execute("DELETE FROM graph_ingest WHERE id = ?", (row_id,))
+        self._last_error = error
+
+    async def run(self, storage):
+        """Drain the queue into an (async) Neo4j storage until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                batch = await asyncio.to_thread(self.claim)
+                if not batch:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                try:
+                    await self._write(storage, batch)
+                except TRANSIENT_ERRORS as e:
+                    print(f"✗ Graph ingest failed for {len(batch)} pages: {str(e)}")
+                    await asyncio.to_thread(self.retry_later, [row_id for row_id, _, _ in batch], str(e))
+                    await asyncio.sleep(self.poll_interval)
+            except Exception as e:
+                # A locked queue file or a failed ack must not end the consumer;
+                # claimed entries become due again when their lease runs out
+                print(f"✗ Graph ingest consumer error: {str(e)}")
+                self._last_error = str(e)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _write(self, storage, batch: List[Tuple[int, int, Dict]]):
+        """Write a batch, bisecting page-level failures so one bad page cannot hold back the rest"""
+        try:
+            await storage.store_relationships_batch([page for _, _, page in batch])
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception as e:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                await self._write(storage, batch[:middle])
+                await self._write(storage, batch[middle:])
+                return
+            row_id, attempts, page = batch[0]
+            if attempts + 1 >= self.max_attempts:
+                print(f"✗ Graph ingest gave up on {page['url']}: {str(e)}")
+                await asyncio.to_thread(self.dead_letter, row_id, str(e))
+            else:
+                print(f"✗ Graph ingest failed for {page['url']}: {str(e)}")
+                await asyncio.to_thread(self.retry_later, [row_id], str(e))
+            return
+        await asyncio.to_thread(self.ack, [row_id for row_id, _, _ in batch])
+
+    def stats(self) -> Dict:
+        """Queue depth and lag for monitoring"""
+        with self._lock:
+            pending, oldest, failing = self._db.execute(
+                "SELECT COUNT(*), MIN(enqueued_at), SUM(attempts > 0) FROM graph_ingest"
+            ).fetchone()
+            dead = self._db.execute("SELECT COUNT(*) FROM graph_dead_letter").fetchone()[0]
+        return {
+            "pending": pending,
+            "failing": failing or 0,
+            "dead_letter": dead,
+            "lag_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "written": self._written,
+            "last_write": self._last_write,
+            "last_error": self._last_error
+        }
+
+    def close(self):
+        self._db.close()
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._db)
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+
+    def __enter__(self):
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._db.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -1,143 +1,344 @@
-from pymongo import MongoClient
-from typing import Dict, List, Optional
-import datetime
-from config.settings import settings
-
-class MongoStorage:
-    def __init__(self):
-        self.client = MongoClient(settings.database.mongo_uri)
-        self.db = self.client[settings.database.mongo_db]
-        self.collection = self.db.scraped_pages
-        self._create_indexes()
-    
-    def _create_indexes(self):
-        """Create indexes for better query performance"""
-        self.collection.create_index("url", unique=True)
-        self.collection.create_index("domain")
-        self.collection.create_index("timestamp")
-        self.collection.create_index("content.metadata.title")
-    
-    def store_page_data(self, url: str, extracted_data: Dict, dom_structure: Dict) -> str:
-        """Store complete page data optimized for LLM consumption"""
-        document = {
-            "url": url,
-            "domain": extracted_data["metadata"]["domain"],
-            "timestamp": datetime.datetime.utcnow(),
-            "title": extracted_data["metadata"]["title"],
-            "description": extracted_data["metadata"]["description"],
-            
-            # LLM-optimized content structure
-            "content": {
-                "text_summary": extracted_data["text_summary"],
-                "content_blocks": extracted_data["content"],
-                "headings": extracted_data["metadata"]["headings"],
-                "structure_info": extracted_data["structure"]
-            },
-            
-            # Relationship data
-            "relationships": {
-                "internal_links": [link for link in extracted_data["links"] if link["internal"]],
-                "external_links": [link for link in extracted_data["links"] if not link["internal"]],
-                "images": extracted_data["images"]
-            },
-            
-            # DOM analysis for advanced processing
-            "dom_analysis": {
-                "tree_structure": dom_structure["tree"],
-                "statistics": dom_structure["statistics"],
-                "semantic_structure": dom_structure["semantic_structure"],
-                "content_blocks": dom_structure["content_blocks"]
-            },
-            
-            # Study-friendly metadata
-            "study_metadata": {
-                "reading_time": self._estimate_reading_time(extracted_data["text_summary"]),
-                "complexity_score": self._calculate_complexity_score(extracted_data),
-                "content_type": self._identify_content_type(extracted_data),
-                "key_topics": self._extract_key_topics(extracted_data)
-            }
-        }
-        
-        # Upsert document
-        result = self.collection.replace_one(
-            {"url": url}, 
-            document, 
-            upsert=True
-        )
-        
-        return str(result.upserted_id or result.matched_count)
-    
-    def get_page_data(self, url: str) -> Optional[Dict]:
-        """Retrieve page data by URL"""
-        return self.collection.find_one({"url": url})
-    
-    def get_pages_by_domain(self, domain: str) -> List[Dict]:
-        """Get all pages from a specific domain"""
-        return list(self.collection.find({"domain": domain}))
-    
-    def search_pages(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search pages by content for LLM queries"""
-        search_filter = {
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"description": {"$regex": query, "$options": "i"}},
-                {"content.text_summary": {"$regex": query, "$options": "i"}}
-            ]
-        }
-        
-        return list(self.collection.find(search_filter).limit(limit))
-    
-    def _estimate_reading_time(self, text: str) -> int:
-        """Estimate reading time in minutes (250 words per minute)"""
-        word_count = len(text.split())
-        return max(1, word_count // 250)
-    
-    def _calculate_complexity_score(self, data: Dict) -> float:
-        """Calculate content complexity for LLM processing hints"""
-        score = 0.0
-        
-        # Text length factor
-        text_length = len(data["text_summary"])
-        score += min(text_length / 1000, 5.0)
-        
-        # Structure complexity
-        content_blocks = len(data["content"])
-        score += min(content_blocks / 10, 3.0)
-        
-        # Link density
-        total_links = len(data["links"])
-        score += min(total_links / 20, 2.0)
-        
-        return round(score, 2)
-    
-    def _identify_content_type(self, data: Dict) -> str:
-        """Identify content type for LLM processing strategy"""
-        title = data["metadata"]["title"].lower()
-        text = data["text_summary"].lower()
-        
-        if any(word in title or word in text for word in ["tutorial", "guide", "how to"]):
-            return "tutorial"
-        elif any(word in title or word in text for word in ["news", "article", "report"]):
-            return "article"
-        elif any(word in title or word in text for word in ["documentation", "docs", "reference"]):
-            return "documentation"
-        elif any(word in title or word in text for word in ["blog", "post", "opinion"]):
-            return "blog_post"
-        else:
-            return "general"
-    
-    def _extract_key_topics(self, data: Dict) -> List[str]:
-        """Extract key topics for study organization"""
-        # Simple keyword extraction from headings and title
-        topics = set()
-        
-        # From title
-        title_words = data["metadata"]["title"].split()
-        topics.update([word.lower() for word in title_words if len(word) > 3])
-        
-        # From headings
-        for heading in data["metadata"]["headings"]:
-            heading_words = heading["text"].split()
-            topics.update([word.lower() for word in heading_words if len(word) > 3])
-        
-        return list(topics)[:10]  # Limit to top 10 topics
\ No newline at end of file
+from pymongo import MongoClient
+from bson import Binary
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import datetime
+from config.settings import settings
+from scraper.feature_extractor import PageFeatures
+from scraper.fingerprint import ContentFingerprint, NEAR_DUPLICATE_DISTANCE, MIN_DEDUP_WORDS, from_signed64
+from storage.blob_codec import compress_blob, decompress_blob
+
+# Indexes shared by the sync and async storage variants
+PAGE_INDEXES = [
+    ("url", {"unique": True}),
+    ("domain", {}),
+    ([("domain", 1), ("url", 1)], {}),
+    ("timestamp", {}),
+    ("content.metadata.title", {}),
+    ("fingerprint.exact", {}),
+    ("fingerprint.bands", {}),
+]
+
+BLOB_INDEXES = [
+    ("url", {"unique": True}),
+]
+
+CHUNK_INDEXES = [
+    ("url", {"unique": True}),
+]
+
+HISTORY_INDEXES = [
+    ("url", {"unique": True}),
+]
+
+# Recent (time, hash) observations kept per URL in crawl_history
+HISTORY_LENGTH = 20
+
+# Read projections: every read names the hot fields it needs. Reads
+# through get_page_data also fetch alias_of to follow duplicate aliases.
+PAGE_PROJECTION = {
+    "_id": 0, "url": 1, "domain": 1, "timestamp": 1, "title": 1, "description": 1,
+    "content": 1, "relationships": 1, "dom_summary": 1, "study_metadata": 1
+}
+LLM_PAGE_PROJECTION = {
+    "_id": 0, "url": 1, "title": 1, "content.text_summary": 1,
+    "content.headings": 1, "study_metadata": 1
+}
+SEARCH_RESULT_PROJECTION = {
+    "_id": 0, "url": 1, "title": 1, "study_metadata": 1,
+    "summary": {"$substrCP": ["$content.text_summary", 0, 500]}
+}
+DOMAIN_LISTING_PROJECTION = {
+    "_id": 0, "url": 1, "title": 1, "timestamp": 1, "study_metadata.content_type": 1, "alias_of": 1
+}
+CHUNK_PROJECTION = {"_id": 0, "url": 1, "chunks": 1, "total_tokens": 1}
+HISTORY_PROJECTION = {"_id": 0, "url": 1, "visits": 1, "changes": 1, "observed_seconds": 1, "last_visit": 1}
+LINK_GRAPH_PROJECTION = {"_id": 0, "url": 1, "relationships.internal_links.url": 1, "relationships.external_links.url": 1}
+RELATED_PAGE_PROJECTION = {"_id": 0, "url": 1, "title": 1, "study_metadata.content_type": 1}
+INDEX_PROJECTION = {
+    "_id": 0, "url": 1, "title": 1, "description": 1, "content.text_summary": 1, "alias_of": 1,
+    "relationships.internal_links.url": 1, "relationships.external_links.url": 1
+}
+EXPORT_PROJECTION = {
+    "_id": 0, "url": 1, "domain": 1, "timestamp": 1, "title": 1, "description": 1,
+    "content.text_summary": 1, "content.headings": 1, "study_metadata": 1
+}
+
+def select_projection(projection: Dict, field_paths: Dict[str, Tuple[str, ...]],
+                      fields: Optional[Iterable[str]]) -> Dict:
+    """Narrow a read projection to the keys behind the requested output fields"""
+    if fields is None:
+        return projection
+    keep = {"_id", "url"}
+    for field in fields:
+        keep.update(field_paths.get(field, ()))
+    return {key: value for key, value in projection.items() if key in keep}
+
+# Canonical (non-alias) pages only
+CANONICAL_PAGES = {"alias_of": {"$exists": False}}
+MAX_ALIAS_HOPS = 3
+
+def pool_options() -> Dict:
+    """Connection-pool sizing for Mongo clients, read from settings"""
+    return {
+        "maxPoolSize": getattr(settings.database, "mongo_max_pool_size", 100),
+        "minPoolSize": getattr(settings.database, "mongo_min_pool_size", 0),
+        "waitQueueTimeoutMS": getattr(settings.database, "mongo_wait_queue_timeout_ms", 10000),
+    }
+
+class MongoStorage:
+    def __init__(self):
+        self.client = MongoClient(settings.database.mongo_uri, **pool_options())
+        self.db = self.client[settings.database.mongo_db]
+        self.collection = self.db.scraped_pages
+        self.blobs = self.db.page_blobs
+        self.chunks = self.db.page_chunks
+        self.history = self.db.crawl_history
+        self._create_indexes()
+    
+    def _create_indexes(self):
+        """Create indexes for better query performance"""
+        for keys, options in PAGE_INDEXES:
+            self.collection.create_index(keys, **options)
+        for keys, options in BLOB_INDEXES:
+            self.blobs.create_index(keys, **options)
+        for keys, options in CHUNK_INDEXES:
+            self.chunks.create_index(keys, **options)
+        for keys, options in HISTORY_INDEXES:
+            self.history.create_index(keys, **options)
+    
+    def store_page_data(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures,
+                        fingerprint: ContentFingerprint, chunks: List[Dict]) -> str:
+        """Store complete page data optimized for LLM consumption"""
+        document, blob, chunk_document = self._build_documents(
+            url, extracted_data, dom_structure, features, fingerprint, chunks
+        )
+        
+        # Upsert hot document, its cold blob and its chunks
+        result = self.collection.replace_one(
+            {"url": url}, 
+            document, 
+            upsert=True
+        )
+        self.blobs.replace_one({"url": url}, blob, upsert=True)
+        self.chunks.replace_one({"url": url}, chunk_document, upsert=True)
+        
+        return str(result.upserted_id or result.matched_count)
+    
+    def store_alias(self, url: str, canonical_url: str, extracted_data: Dict) -> str:
+        """Store a duplicate page as a lightweight alias of its canonical page"""
+        result = self.collection.replace_one(
+            {"url": url},
+            self._build_alias(url, canonical_url, extracted_data),
+            upsert=True
+        )
+        # A URL that used to be canonical keeps no content of its own
+        self.blobs.delete_one({"url": url})
+        self.chunks.delete_one({"url": url})
+        return str(result.upserted_id or result.matched_count)
+    
+    def find_duplicate(self, fingerprint: ContentFingerprint, url: str) -> Optional[str]:
+        """Return the canonical URL whose content matches this fingerprint, if any"""
+        if not fingerprint.dedupable:
+            return None
+        candidates = self.collection.find(
+            self._duplicate_filter(fingerprint, url), {"_id": 0, "url": 1, "fingerprint": 1}
+        ).limit(50)
+        return self._pick_canonical(fingerprint, candidates)
+    
+    def _duplicate_filter(self, fingerprint: ContentFingerprint, url: str) -> Dict:
+        return {
+            **CANONICAL_PAGES,
+            "url": {"$ne": url},
+            # Pages stored before word counts were recorded stay eligible
+            "fingerprint.words": {"$not": {"$lt": MIN_DEDUP_WORDS}},
+            "$or": [
+                {"fingerprint.exact": fingerprint.exact_hash},
+                {"fingerprint.bands": {"$in": list(fingerprint.bands)}}
+            ]
+        }
+    
+    def _pick_canonical(self, fingerprint: ContentFingerprint, candidates) -> Optional[str]:
+        """Prefer an exact match, else the nearest SimHash within the threshold"""
+        best_url, best_distance = None, NEAR_DUPLICATE_DISTANCE + 1
+        for candidate in candidates:
+            stored = candidate["fingerprint"]
+            if stored["exact"] == fingerprint.exact_hash:
+                return candidate["url"]
+            distance = fingerprint.distance(from_signed64(stored["simhash"]))
+            if distance < best_distance:
+                best_url, best_distance = candidate["url"], distance
+        return best_url
+    
+    def _build_alias(self, url: str, canonical_url: str, extracted_data: Dict) -> Dict:
+        return {
+            "url": url,
+            "domain": extracted_data["metadata"]["domain"],
+            "timestamp": datetime.datetime.utcnow(),
+            "title": extracted_data["metadata"]["title"],
+            "alias_of": canonical_url
+        }
+    
+    def _build_documents(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures,
+                         fingerprint: ContentFingerprint, chunks: List[Dict]) -> Tuple[Dict, Dict, Dict]:
+        """Build the hot scraped_pages document, the compressed page_blobs entry
+        and the page_chunks entry holding token-counted chunks of the full text
+        
+        Raw block HTML and the DOM tree are only needed for reprocessing, so
+        they live in the cold blob; reads never pull them unless asked.
+        """
+        codec, payload = compress_blob({
+            "content_blocks": extracted_data["content"],
+            "dom_analysis": {
+                "tree_structure": dom_structure["tree"],
+                "statistics": dom_structure["statistics"],
+                "semantic_structure": dom_structure["semantic_structure"],
+                "content_blocks": dom_structure["content_blocks"]
+            }
+        })
+        blob = {
+            "url": url,
+            "codec": codec,
+            "size": len(payload),
+            "data": Binary(payload)
+        }
+        
+        total_tokens = sum(chunk["tokens"] for chunk in chunks)
+        chunk_document = {
+            "url": url,
+            "chunks": chunks,
+            "total_tokens": total_tokens
+        }
+        
+        document = {
+            "url": url,
+            "domain": extracted_data["metadata"]["domain"],
+            "timestamp": datetime.datetime.utcnow(),
+            "title": extracted_data["metadata"]["title"],
+            "description": extracted_data["metadata"]["description"],
+            
+            # LLM-optimized content structure
+            "content": {
+                "text_summary": extracted_data["text_summary"],
+                "headings": extracted_data["metadata"]["headings"],
+                "structure_info": extracted_data["structure"],
+                "content_block_count": len(extracted_data["content"]),
+                "chunk_count": len(chunks),
+                "total_tokens": total_tokens
+            },
+            
+            # Relationship data
+            "relationships": {
+                "internal_links": [link for link in extracted_data["links"] if link["internal"]],
+                "external_links": [link for link in extracted_data["links"] if not link["internal"]],
+                "images": extracted_data["images"]
+            },
+            
+            # DOM summary; the full analysis is in the cold blob
+            "dom_summary": {
+                "max_depth": dom_structure["statistics"]["max_depth"],
+                "total_elements": dom_structure["statistics"]["total_elements"],
+                "has_semantic_structure": dom_structure["semantic_structure"]["has_semantic_structure"]
+            },
+            
+            # Study-friendly metadata
+            "study_metadata": features.to_dict(),
+            
+            # Content fingerprint for duplicate detection
+            "fingerprint": fingerprint.to_dict()
+        }
+        
+        return document, blob, chunk_document
+    
+    def get_page_data(self, url: str, projection: Dict = PAGE_PROJECTION) -> Optional[Dict]:
+        """Retrieve the hot page document by URL, following duplicate aliases"""
+        for _ in range(MAX_ALIAS_HOPS + 1):
+            document = self.collection.find_one({"url": url}, {**projection, "alias_of": 1})
+            if not document or "alias_of" not in document:
+                return document
+            url = document["alias_of"]
+        return None
+    
+    def get_page_chunks(self, urls: List[str]) -> Dict[str, List[Dict]]:
+        """Stored chunks for each URL"""
+        documents = self.chunks.find({"url": {"$in": urls}}, CHUNK_PROJECTION)
+        return {document["url"]: document["chunks"] for document in documents}
+    
+    def get_page_blob(self, url: str) -> Optional[Dict]:
+        """Retrieve the cold content blocks and DOM analysis for a page"""
+        return self._decode_blob(self.blobs.find_one({"url": url}, {"_id": 0, "codec": 1, "data": 1}))
+    
+    def _decode_blob(self, blob: Optional[Dict]) -> Optional[Dict]:
+        if not blob:
+            return None
+        return decompress_blob(blob["codec"], blob["data"])
+    
+    def get_pages_by_domain(self, domain: str, after: Optional[str] = None, limit: int = 50,
+                            projection: Dict = DOMAIN_LISTING_PROJECTION) -> Tuple[List[Dict], Optional[str]]:
+        """Get one keyset page of a domain's pages, ordered by URL
+        
+        Returns the pages and the cursor to pass as `after` for the next
+        page (None when exhausted). Served by the (domain, url) index.
+        """
+        cursor = self.collection.find(
+            self._domain_filter(domain, after), projection
+        ).sort("url", 1).limit(limit)
+        return self._keyset_page(list(cursor), limit)
+    
+    def _domain_filter(self, domain: str, after: Optional[str]) -> Dict:
+        query = {"domain": domain}
+        if after is not None:
+            query["url"] = {"$gt": after}
+        return query
+    
+    def _keyset_page(self, pages: List[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+        next_after = pages[-1]["url"] if len(pages) == limit else None
+        return pages, next_after
+    
+    def record_visit(self, url: str, exact_hash: str):
+        """Record a fetch of `url` and whether its content hash changed since the last one"""
+        self.history.update_one({"url": url}, self._visit_update(exact_hash, datetime.datetime.utcnow()), upsert=True)
+    
+    def _visit_update(self, exact_hash: str, when: datetime.datetime) -> List[Dict]:
+        """Pipeline update folding one visit into a URL's counters in a single atomic write"""
+        seen = {"$ne": [{"$type": "$last_visit"}, "missing"]}
+        return [
+            {"$set": {"_changed": {"$and": [seen, {"$ne": ["$last_hash", exact_hash]}]}}},
+            {"$set": {
+                "visits": {"$add": [{"$ifNull": ["$visits", 0]}, 1]},
+                "changes": {"$add": [{"$ifNull": ["$changes", 0]}, {"$cond": ["$_changed", 1, 0]}]},
+                "observed_seconds": {"$add": [
+                    {"$ifNull": ["$observed_seconds", 0]},
+                    {"$cond": [seen, {"$divide": [{"$subtract": [when, "$last_visit"]}, 1000]}, 0]}
+                ]},
+                "first_visit": {"$ifNull": ["$first_visit", when]},
+                "last_changed": {"$cond": ["$_changed", when, {"$ifNull": ["$last_changed", when]}]},
+                "history": {"$slice": [
+                    {"$concatArrays": [{"$ifNull": ["$history", []]}, [{"at": when, "hash": exact_hash}]]},
+                    -HISTORY_LENGTH
+                ]},
+                "last_hash": exact_hash,
+                "last_visit": when
+            }},
+            {"$unset": "_changed"}
+        ]
+    
+    def iter_history(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """Stream every URL's visit counters for recrawl planning"""
+        return self.history.find({}, HISTORY_PROJECTION, batch_size=batch_size)
+    
+    def iter_pages(self, projection: Dict, query: Optional[Dict] = None, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream matching pages with a projection, without loading them all"""
+        return self.collection.find(query or {}, projection, batch_size=batch_size)
+    
+    def get_pages_by_urls(self, urls: List[str], projection: Dict = PAGE_PROJECTION) -> List[Dict]:
+        """Fetch pages for ranked URLs, preserving the given order"""
+        documents = self.collection.find({"url": {"$in": urls}}, projection)
+        return self._order_by_urls(urls, documents)
+    
+    def _order_by_urls(self, urls: List[str], documents) -> List[Dict]:
+        by_url = {document["url"]: document for document in documents}
+        return [by_url[url] for url in urls if url in by_url]
+    
+    def close(self):
+        """Close database connection"""
+        self.client.close()
\ No newline at end of file
@@ -1,216 +1,259 @@
-from neo4j import GraphDatabase
-from typing import Dict, List
-from urllib.parse import urlparse
-from config.settings import settings
-
-class Neo4jStorage:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(
-            settings.database.neo4j_uri,
-            auth=(settings.database.neo4j_user, settings.database.neo4j_password)
-        )
-        self._create_constraints()
-    
-    def _create_constraints(self):
-        """Create constraints and indexes for better performance"""
-        with self.driver.session() as session:
-            try:
-                session.run("CREATE CONSTRAINT page_url IF NOT EXISTS FOR (p:Page) REQUIRE p.url IS UNIQUE")
-                session.run("CREATE CONSTRAINT domain_name IF NOT EXISTS FOR (d:Domain) REQUIRE d.name IS UNIQUE")
-                session.run("CREATE INDEX page_title IF NOT EXISTS FOR (p:Page) ON (p.title)")
-            except Exception as e:
-                pass  # Constraints might already exist
-    
-    def store_relationships(self, url: str, extracted_data: Dict, dom_structure: Dict):
-        """Store page relationships and structure in Neo4j"""
-        with self.driver.session() as session:
-            # Create main page node
-            self._create_page_node(session, url, extracted_data)
-            
-            # Create domain relationships
-            self._create_domain_relationships(session, url, extracted_data)
-            
-            # Create content relationships
-            self._create_content_relationships(session, url, extracted_data)
-            
-            # Create link relationships
-            self._create_link_relationships(session, url, extracted_data["links"])
-            
-            # Create DOM structure relationships
-            self._create_dom_relationships(session, url, dom_structure)
-    
-    def _create_page_node(self, session, url: str, data: Dict):
-        """Create or update page node with LLM-friendly properties"""
-        query = """
-        MERGE (p:Page {url: $url})
-        SET p.title = $title,
-            p.description = $description,
-            p.domain = $domain,
-            p.content_type = $content_type,
-            p.complexity_score = $complexity_score,
-            p.reading_time = $reading_time,
-            p.word_count = $word_count,
-            p.last_scraped = datetime()
-        """
-        
-        session.run(query, {
-            "url": url,
-            "title": data["metadata"]["title"],
-            "description": data["metadata"]["description"],
-            "domain": data["metadata"]["domain"],
-            "content_type": self._identify_content_type(data),
-            "complexity_score": self._calculate_complexity_score(data),
-            "reading_time": len(data["text_summary"].split()) // 250,
-            "word_count": len(data["text_summary"].split())
-        })
-    
-    def _create_domain_relationships(self, session, url: str, data: Dict):
-        """Create domain nodes and relationships"""
-        domain = data["metadata"]["domain"]
-        
-        # Create domain node
-        session.run("""
-        MERGE (d:Domain {name: $domain})
-        SET d.last_updated = datetime()
-        """, {"domain": domain})
-        
-        # Link page to domain
-        session.run("""
-        MATCH (p:Page {url: $url})
-        MATCH (d:Domain {name: $domain})
-        MERGE (p)-[:BELONGS_TO]->(d)
-        """, {"url": url, "domain": domain})
-    
-    def _create_content_relationships(self, session, url: str, data: Dict):
-        """Create content structure relationships for LLM understanding"""
-        # Create topic nodes from headings
-        for i, heading in enumerate(data["metadata"]["headings"]):
-            session.run("""
-            MATCH (p:Page {url: $url})
-            MERGE (h:Heading {text: $text, level: $level, page_url: $url})
-            SET h.position = $position
-            MERGE (p)-[:HAS_HEADING]->(h)
-            """, {
-                "url": url,
-                "text": heading["text"],
-                "level": heading["level"],
-                "position": i
-            })
-        
-        # Create content block relationships
-        for i, block in enumerate(data["content"][:10]):  # Limit for performance
-            session.run("""
-            MATCH (p:Page {url: $url})
-            MERGE (c:ContentBlock {text: $text, page_url: $url, position: $position})
-            SET c.tag = $tag,
-                c.length = $length
-            MERGE (p)-[:HAS_CONTENT]->(c)
-            """, {
-                "url": url,
-                "text": block["text"][:500],  # Truncate for storage
-                "tag": block["tag"],
-                "length": len(block["text"]),
-                "position": i
-            })
-    
-    def _create_link_relationships(self, session, url: str, links: List[Dict]):
-        """Create link relationships for navigation understanding"""
-        for link in links[:20]:  # Limit for performance
-            target_url = link["url"]
-            link_text = link["text"]
-            is_internal = link["internal"]
-            
-            # Create target page node (minimal)
-            session.run("""
-            MERGE (target:Page {url: $target_url})
-            SET target.discovered_via = $source_url
-            """, {"target_url": target_url, "source_url": url})
-            
-            # Create relationship
-            relationship_type = "LINKS_TO_INTERNAL" if is_internal else "LINKS_TO_EXTERNAL"
-            session.run(f"""
-            MATCH (source:Page {{url: $source_url}})
-            MATCH (target:Page {{url: $target_url}})
-            MERGE (source)-[r:{relationship_type}]->(target)
-            SET r.link_text = $link_text,
-                r.is_internal = $is_internal
-            """, {
-                "source_url": url,
-                "target_url": target_url,
-                "link_text": link_text,
-                "is_internal": is_internal
-            })
-    
-    def _create_dom_relationships(self, session, url: str, dom_structure: Dict):
-        """Create DOM structure relationships for content hierarchy"""
-        # Create semantic structure nodes
-        semantic_elements = dom_structure["semantic_structure"]["semantic_elements"]
-        for tag, count in semantic_elements.items():
-            if count > 0:
-                session.run("""
-                MATCH (p:Page {url: $url})
-                MERGE (s:SemanticElement {tag: $tag, page_url: $url})
-                SET s.count = $count
-                MERGE (p)-[:HAS_SEMANTIC_ELEMENT]->(s)
-                """, {"url": url, "tag": tag, "count": count})
-    
-    def get_page_relationships(self, url: str) -> Dict:
-        """Get all relationships for a page for LLM context"""
-        with self.driver.session() as session:
-            result = session.run("""
-            MATCH (p:Page {url: $url})
-            OPTIONAL MATCH (p)-[:LINKS_TO_INTERNAL]->(internal:Page)
-            OPTIONAL MATCH (p)-[:LINKS_TO_EXTERNAL]->(external:Page)
-            OPTIONAL MATCH (p)-[:HAS_HEADING]->(h:Heading)
-            RETURN p, collect(DISTINCT internal.url) as internal_links,
-                   collect(DISTINCT external.url) as external_links,
-                   collect(DISTINCT {text: h.text, level: h.level}) as headings
-            """, {"url": url})
-            
-            record = result.single()
-            if record:
-                return {
-                    "page": dict(record["p"]),
-                    "internal_links": record["internal_links"],
-                    "external_links": record["external_links"],
-                    "headings": record["headings"]
-                }
-            return {}
-    
-    def get_related_pages(self, url: str, limit: int = 5) -> List[Dict]:
-        """Find related pages for LLM context and study suggestions"""
-        with self.driver.session() as session:
-            result = session.run("""
-            MATCH (p:Page {url: $url})
-            MATCH (p)-[:BELONGS_TO]->(d:Domain)
-            MATCH (related:Page)-[:BELONGS_TO]->(d)
-            WHERE related.url <> $url
-            RETURN related.url as url, related.title as title, 
-                   related.content_type as content_type,
-                   related.complexity_score as complexity_score
-            ORDER BY related.complexity_score DESC
-            LIMIT $limit
-            """, {"url": url, "limit": limit})
-            
-            return [dict(record) for record in result]
-    
-    def _identify_content_type(self, data: Dict) -> str:
-        """Identify content type for graph relationships"""
-        title = data["metadata"]["title"].lower()
-        if "tutorial" in title or "guide" in title:
-            return "tutorial"
-        elif "documentation" in title or "docs" in title:
-            return "documentation"
-        elif "blog" in title or "article" in title:
-            return "article"
-        return "general"
-    
-    def _calculate_complexity_score(self, data: Dict) -> float:
-        """Calculate complexity score for relationship weighting"""
-        text_length = len(data["text_summary"])
-        content_blocks = len(data["content"])
-        return min(text_length / 1000 + content_blocks / 10, 10.0)
-    
-    def close(self):
-        """Close database connection"""
+from neo4j import GraphDatabase
+from typing import Dict, List, Optional
+from config.settings import settings
+from scraper.feature_extractor import PageFeatures
+
+# Schema statements shared by the sync and async storage variants
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT page_url IF NOT EXISTS FOR (p:Page) REQUIRE p.url IS UNIQUE",
+    "CREATE CONSTRAINT domain_name IF NOT EXISTS FOR (d:Domain) REQUIRE d.name IS UNIQUE",
+    "CREATE INDEX page_title IF NOT EXISTS FOR (p:Page) ON (p.title)",
+]
+
+def driver_options() -> Dict:
+    """Connection-pool sizing for Neo4j drivers, read from settings"""
+    return {
+        "auth": (settings.database.neo4j_user, settings.database.neo4j_password),
+        "max_connection_pool_size": getattr(settings.database, "neo4j_max_pool_size", 100),
+        "connection_acquisition_timeout": getattr(settings.database, "neo4j_acquisition_timeout", 60.0),
+    }
+
+# Write statements run once per transaction over a $pages parameter list;
+# each page is a dict built by Neo4jStorage.build_page_params
+WRITE_PAGES_QUERIES = [
+    """
+    UNWIND $pages AS page
+    MERGE (p:Page {url: page.url})
+    SET p.title = page.title,
+        p.description = page.description,
+        p.domain = page.domain,
+        p.content_type = page.content_type,
+        p.complexity_score = page.complexity_score,
+        p.reading_time = page.reading_time,
+        p.word_count = page.word_count,
+        p.last_scraped = datetime()
+    MERGE (d:Domain {name: page.domain})
+    SET d.last_updated = datetime()
+    MERGE (p)-[:BELONGS_TO]->(d)
+    """,
+    """
+    UNWIND $pages AS page
+    MATCH (p:Page {url: page.url})
+    UNWIND page.headings AS heading
+    MERGE (h:Heading {text: heading.text, level: heading.level, page_url: page.url})
+    SET h.position = heading.position
+    MERGE (p)-[:HAS_HEADING]->(h)
+    """,
+    """
+    UNWIND $pages AS page
+    MATCH (p:Page {url: page.url})
+    UNWIND page.content_blocks AS block
+    MERGE (c:ContentBlock {text: block.text, page_url: page.url, position: block.position})
+    SET c.tag = block.tag,
+        c.length = block.length
+    MERGE (p)-[:HAS_CONTENT]->(c)
+    """,
+    """
+    UNWIND $pages AS page
+    MATCH (source:Page {url: page.url})
+    UNWIND page.internal_links AS link
+    MERGE (target:Page {url: link.url})
+    SET target.discovered_via = page.url
+    MERGE (source)-[r:LINKS_TO_INTERNAL]->(target)
+    SET r.link_text = link.text,
+        r.is_internal = true
+    """,
+    """
+    UNWIND $pages AS page
+    MATCH (source:Page {url: page.url})
+    UNWIND page.external_links AS link
+    MERGE (target:Page {url: link.url})
+    SET target.discovered_via = page.url
+    MERGE (source)-[r:LINKS_TO_EXTERNAL]->(target)
+    SET r.link_text = link.text,
+        r.is_internal = false
+    """,
+    """
+    UNWIND $pages AS page
+    MATCH (p:Page {url: page.url})
+    UNWIND page.semantic_elements AS element
+    MERGE (s:SemanticElement {tag: element.tag, page_url: page.url})
+    SET s.count = element.count
+    MERGE (p)-[:HAS_SEMANTIC_ELEMENT]->(s)
+    """,
+]
+
+# One row per requested URL; each relationship type is collected in its own
+# subquery, so link and heading counts multiply nothing, and is capped and
+# paged independently by its own skip. Totals come from COUNT subqueries.
+PAGE_RELATIONSHIPS_QUERY = """
+UNWIND $urls AS url
+MATCH (p:Page {url: url})
+CALL {
+    WITH p
+    MATCH (p)-[:LINKS_TO_INTERNAL]->(internal:Page)
+    WITH internal ORDER BY internal.url SKIP $internal_skip LIMIT $internal_limit
+    RETURN collect(internal.url) AS internal_links
+}
+CALL {
+    WITH p
+    MATCH (p)-[:LINKS_TO_EXTERNAL]->(external:Page)
+    WITH external ORDER BY external.url SKIP $external_skip LIMIT $external_limit
+    RETURN collect(external.url) AS external_links
+}
+CALL {
+    WITH p
+    MATCH (p)-[:HAS_HEADING]->(h:Heading)
+    WITH h ORDER BY h.position SKIP $heading_skip LIMIT $heading_limit
+    RETURN collect({text: h.text, level: h.level}) AS headings
+}
+RETURN url, p, internal_links, external_links, headings,
+       COUNT { (p)-[:LINKS_TO_INTERNAL]->() } AS internal_total,
+       COUNT { (p)-[:LINKS_TO_EXTERNAL]->() } AS external_total,
+       COUNT { (p)-[:HAS_HEADING]->() } AS heading_total
+"""
+
+# Default per-type caps for PAGE_RELATIONSHIPS_QUERY
+RELATIONSHIP_LIMITS = {"internal_links": 50, "external_links": 50, "headings": 50}
+
+RELATED_PAGES_QUERY = """
+MATCH (p:Page {url: $url})
+MATCH (p)-[:BELONGS_TO]->(d:Domain)
+MATCH (related:Page)-[:BELONGS_TO]->(d)
+WHERE related.url <> $url
+RETURN related.url as url, related.title as title, 
+       related.content_type as content_type,
+       related.complexity_score as complexity_score
+ORDER BY related.complexity_score DESC
+LIMIT $limit
+"""
+
+class Neo4jStorage:
+    def __init__(self):
+        self.driver = GraphDatabase.driver(settings.database.neo4j_uri, **driver_options())
+        self.batch_size = getattr(settings.database, "neo4j_write_batch_size", 100)
+        self._create_constraints()
+    
+    def _create_constraints(self):
+        """Create constraints and indexes for better performance"""
+        with self.driver.session() as session:
+            try:
+                for statement in SCHEMA_STATEMENTS:
+                    session.run(statement)
+            except Exception as e:
+                pass  # Constraints might already exist
+    
+    def store_relationships(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures):
+        """Store page relationships and structure in one write transaction"""
+        self.store_relationships_batch([self.build_page_params(url, extracted_data, dom_structure, features)])
+    
+    def store_relationships_batch(self, pages: List[Dict]):
+        """Store many pages' relationships, batch_size pages per write transaction"""
+        with self.driver.session() as session:
+            for start in range(0, len(pages), self.batch_size):
+                session.execute_write(self._write_pages, pages[start:start + self.batch_size])
+    
+    @staticmethod
+    def _write_pages(tx, pages: List[Dict]):
+        for query in WRITE_PAGES_QUERIES:
+            tx.run(query, pages=pages).consume()
+    
+    def build_page_params(self, url: str, extracted_data: Dict, dom_structure: Dict, features: PageFeatures) -> Dict:
+        """Flatten one page into the JSON-safe parameters WRITE_PAGES_QUERIES expect"""
+        links = extracted_data["links"][:20]  # Limit for performance
+        semantic_elements = dom_structure["semantic_structure"]["semantic_elements"]
+        
+        return {
+            "url": url,
+            "title": extracted_data["metadata"]["title"],
+            "description": extracted_data["metadata"]["description"],
+            "domain": extracted_data["metadata"]["domain"],
+            "content_type": features.content_type,
+            "complexity_score": features.complexity_score,
+            "reading_time": features.reading_time,
+            "word_count": features.word_count,
+            "headings": [
+                {"text": heading["text"], "level": heading["level"], "position": i}
+                for i, heading in enumerate(extracted_data["metadata"]["headings"])
+            ],
+            "content_blocks": [
+                {
+                    "text": block["text"][:500],  # Truncate for storage
+                    "tag": block["tag"],
+                    "length": len(block["text"]),
+                    "position": i
+                }
+                for i, block in enumerate(extracted_data["content"][:10])  # Limit for performance
+            ],
+            "internal_links": [{"url": link["url"], "text": link["text"]} for link in links if link["internal"]],
+            "external_links": [{"url": link["url"], "text": link["text"]} for link in links if not link["internal"]],
+            "semantic_elements": [
+                {"tag": tag, "count": count} for tag, count in semantic_elements.items() if count > 0
+            ]
+        }
+    
+    def get_page_relationships(self, url: str) -> Dict:
+        """Get all relationships for a page for LLM context"""
+        return self.get_page_relationships_batch([url]).get(url, {})
+    
+    def get_page_relationships_batch(self, urls: List[str], limits: Optional[Dict[str, int]] = None,
+                                     cursor: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+        """Relationships for many pages in one query, keyed by URL; unknown URLs are omitted
+
+        `cursor` maps a relationship type to how many of it to skip; pass a
+        page's "next_cursor" back to continue each type where it stopped.
+        """
+        if not urls:
+            return {}
+        with self.driver.session() as session:
+            result = session.run(PAGE_RELATIONSHIPS_QUERY, self._relationship_params(urls, limits, cursor))
+            return {record["url"]: self._page_relationships_from_record(record, cursor) for record in result}
+    
+    def _relationship_params(self, urls: List[str], limits: Optional[Dict[str, int]],
+                             cursor: Optional[Dict[str, int]]) -> Dict:
+        limits = {**RELATIONSHIP_LIMITS, **(limits or {})}
+        cursor = cursor or {}
+        return {
+            "urls": list(dict.fromkeys(urls)),
+            "internal_skip": cursor.get("internal_links", 0),
+            "external_skip": cursor.get("external_links", 0),
+            "heading_skip": cursor.get("headings", 0),
+            "internal_limit": limits["internal_links"],
+            "external_limit": limits["external_links"],
+            "heading_limit": limits["headings"]
+        }
+    
+    def _page_relationships_from_record(self, record, cursor: Optional[Dict[str, int]] = None) -> Dict:
+        """Shape a PAGE_RELATIONSHIPS_QUERY record for LLM context
+        
+        "next_cursor" holds the skip for each type that has more to fetch.
+        """
+        cursor = cursor or {}
+        totals = {
+            "internal_links": record["internal_total"],
+            "external_links": record["external_total"],
+            "headings": record["heading_total"]
+        }
+        next_cursor = {}
+        for kind, total in totals.items():
+            fetched = cursor.get(kind, 0) + len(record[kind])
+            if fetched < total:
+                next_cursor[kind] = fetched
+        return {
+            "page": dict(record["p"]),
+            "internal_links": record["internal_links"],
+            "external_links": record["external_links"],
+            "headings": record["headings"],
+            "totals": totals,
+            "next_cursor": next_cursor
+        }
+    
+    def get_related_pages(self, url: str, limit: int = 5) -> List[Dict]:
+        """Find related pages for LLM context and study suggestions"""
+        with self.driver.session() as session:
+            result = session.run(RELATED_PAGES_QUERY, {"url": url, "limit": limit})
+            return [dict(record) for record in result]
+    
+    def close(self):
+        """Close database connection"""
         self.driver.close()
\ No newline at end of file
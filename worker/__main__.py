@@ -0,0 +1,61 @@
+"""Run scrape workers that lease jobs from the shared job queue.
+
+    python -m worker --processes 4 --concurrency 4
+    python -m worker --queue redis://queue-host:6379/0
+
+Each process runs its own event loop and browser; --concurrency pages are
+processed at once per process.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+from typing import List, Optional
+from config.settings import settings
+from worker.queue import open_queue
+from worker.runner import Worker
+
+def run_process(queue_url: str, concurrency: int, visibility_timeout: float):
+    queue = open_queue(queue_url)
+    try:
+        worker = Worker(
+            queue, concurrency, visibility_timeout,
+            min_delay=getattr(settings.scraping, "min_crawl_delay", 0.0)
+        )
+        asyncio.run(worker.run())
+    finally:
+        queue.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run scrape workers")
+    parser.add_argument("--queue", default=getattr(settings.scraping, "job_queue_url", "sqlite:///data/jobs.db"),
+                        help="sqlite:///<path> or redis://host:port/db")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="worker processes, each with its own browser")
+    parser.add_argument("--concurrency", type=int, default=4, help="pages in flight per process")
+    parser.add_argument("--visibility-timeout", type=float, default=300.0,
+                        help="seconds before an unacknowledged job is leased again")
+    args = parser.parse_args(argv)
+
+    # Spawn, not fork: every process starts its own browser and event loop
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_process, args=(args.queue, args.concurrency, args.visibility_timeout),
+                        name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    print(f"✓ Started {len(processes)} worker processes on {args.queue}", file=sys.stderr)
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Children received the same SIGINT and are finishing their jobs
+        for process in processes:
+            process.join()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,502 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch_id TEXT NOT NULL,
+        url TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        lease_owner TEXT,
+        lease_expires REAL,
+        created_at REAL NOT NULL,
+        finished_at REAL,
+        error TEXT,
+        result TEXT,
+        not_before REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, available_at)",
+    "CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (state, lease_expires)",
+    "CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)",
+    """
+    CREATE TABLE IF NOT EXISTS completions (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL,
+        finished_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS completions_finished ON completions (finished_at)",
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch_id TEXT NOT NULL,
+        event TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS events_batch ON events (batch_id, seq)",
+    "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)",
+    """
+    CREATE TABLE IF NOT EXISTS domains (
+        domain TEXT PRIMARY KEY,
+        next_fetch REAL NOT NULL
+    )
+    """,
+]
+
+# Job states: pending -> leased -> done | failed (or back to pending for a retry)
+TERMINAL_STATES = ("done", "failed")
+
+class SQLiteJobQueue:
+    """Durable scrape-job queue in a SQLite file shared by local processes.
+
+    Workers lease one job at a time for a visibility timeout and extend the
+    lease while they work. A job whose lease runs out (its worker died) is
+    leased again; failures are retried with exponential backoff until
+    max_attempts. Every completed URL is also appended to a completions log
+    that the API tails to keep its in-process indexes current, and workers
+    publish each job's stage events for the batch's progress stream.
+    Finished jobs, completions and events are pruned after `retention`
+    seconds.
+    """
+
+    def __init__(self, path: str = "data/jobs.db", max_attempts: int = 3, retry_delay: float = 30.0,
+                 retention: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention = retention
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=10000")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+
+    def enqueue(self, urls: List[str], batch_id: Optional[str] = None) -> str:
+        """Queue one job per URL under a batch id"""
+        batch_id = batch_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO jobs (batch_id, url, available_at, created_at) VALUES (?, ?, ?, ?)",
+                [(batch_id, url, now, now) for url in urls]
+            )
+        return batch_id
+
+    def lease(self, owner: str, visibility_timeout: float) -> Optional[Dict]:
+        """Lease the oldest available job, or one whose lease has expired
+
+        A job released into a reserved crawl slot comes back with that
+        slot's time under "not_before"; the reservation is used up here.
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            while True:
+                row = self._db.execute(
+                    "SELECT id, batch_id, url, attempts, not_before FROM jobs "
+                    "WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires <= ?) "
+                    "ORDER BY id LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                job_id, batch_id, url, attempts, not_before = row
+                if attempts >= self.max_attempts:
+                    # Its last lease expired without an answer
+                    self._db.execute(
+                        "UPDATE jobs SET state = 'failed', error = 'lease expired', finished_at = ? WHERE id = ?",
+                        (now, job_id)
+                    )
+                    continue
+
+                self._db.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                    "not_before = NULL WHERE id = ?",
+                    (owner, now + visibility_timeout, job_id)
+                )
+                return {
+                    "id": str(job_id), "batch_id": batch_id, "url": url, "attempts": attempts + 1, "owner": owner,
+                    "not_before": not_before
+                }
+
+    def extend(self, job: Dict, visibility_timeout: float) -> bool:
+        """Push a held lease out; False if the job was lost to another worker"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time() + visibility_timeout, int(job["id"]), job["owner"])
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Dict, result: Dict) -> bool:
+        """Mark a leased job done and log the stored URL for index followers
+
+        The stored URL is the one after redirects (result["url"]), which may
+        differ from the queued one.
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'done', finished_at = ?, result = ?, error = NULL "
+                "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (now, json.dumps(result, default=str), int(job["id"]), job["owner"])
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._db.execute(
+                "INSERT INTO completions (url, finished_at) VALUES (?, ?)", (result.get("url") or job["url"], now)
+            )
+        return True
+
+    def release(self, job: Dict, not_before: float) -> bool:
+        """Hand a leased job back until its reserved crawl slot, without using an attempt"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'pending', attempts = attempts - 1, available_at = ?, not_before = ?, "
+                "lease_owner = NULL WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (not_before, not_before, int(job["id"]), job["owner"])
+            )
+        return cursor.rowcount == 1
+
+    def reserve_domain(self, domain: str, delay: float) -> float:
+        """Reserve the domain's next crawl slot, at least `delay` seconds after the previous one
+
+        Shared by every worker process; returns the slot's start time.
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._db.execute("SELECT next_fetch FROM domains WHERE domain = ?", (domain,)).fetchone()
+            start = max(now, row[0] if row else now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO domains (domain, next_fetch) VALUES (?, ?)", (domain, start + delay)
+            )
+        return start
+
+    def publish(self, job: Dict, event: Dict):
+        """Record a stage event of a leased job for its batch's followers"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO events (batch_id, event, created_at) VALUES (?, ?, ?)",
+                (job["batch_id"], json.dumps(event, default=str), time.time())
+            )
+
+    def events_since(self, batch_id: str, cursor: str = "0", limit: int = 500) -> Tuple[str, List[Dict]]:
+        """Stage events of a batch after `cursor`, and the cursor to resume from"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, event FROM events WHERE batch_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (batch_id, int(cursor), limit)
+            ).fetchall()
+        if not rows:
+            return cursor, []
+        return str(rows[-1][0]), [json.loads(event) for _, event in rows]
+
+    def fail(self, job: Dict, error: str, retry: bool = True) -> str:
+        """Schedule a retry with backoff, or fail for good; returns the new state"""
+        now = time.time()
+        state = "failed" if not retry or job["attempts"] >= self.max_attempts else "pending"
+        delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, available_at = ?, lease_owner = NULL, finished_at = ? "
+                "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (state, error, now + delay, now if state == "failed" else None, int(job["id"]), job["owner"])
+            )
+        return state
+
+    def batch_status(self, batch_id: str) -> List[Dict]:
+        """Every job of a batch with its state, error and result"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, url, state, attempts, error, result FROM jobs WHERE batch_id = ? ORDER BY id",
+                (batch_id,)
+            ).fetchall()
+        return [
+            {
+                "id": str(job_id), "url": url, "state": state, "attempts": attempts,
+                "error": error, "result": json.loads(result) if result else None
+            }
+            for job_id, url, state, attempts, error, result in rows
+        ]
+
+    def completed_since(self, cursor: str = "0", limit: int = 500) -> Tuple[str, List[str]]:
+        """URLs completed after `cursor`, and the cursor to resume from"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, url FROM completions WHERE seq > ? ORDER BY seq LIMIT ?", (int(cursor), limit)
+            ).fetchall()
+        if not rows:
+            return cursor, []
+        return str(rows[-1][0]), [url for _, url in rows]
+
+    def prune(self) -> int:
+        """Delete finished jobs, completions and events older than the retention; returns rows deleted"""
+        cutoff = time.time() - self.retention
+        with self._lock, self._transaction():
+            deleted = self._db.execute(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+            ).rowcount
+            deleted += self._db.execute("DELETE FROM completions WHERE finished_at < ?", (cutoff,)).rowcount
+            deleted += self._db.execute("DELETE FROM events WHERE created_at < ?", (cutoff,)).rowcount
+            deleted += self._db.execute("DELETE FROM domains WHERE next_fetch < ?", (cutoff,)).rowcount
+        return deleted
+
+    def stats(self) -> Dict:
+        """Job counts by state and the age of the oldest waiting job"""
+        with self._lock:
+            counts = dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            oldest = self._db.execute("SELECT MIN(created_at) FROM jobs WHERE state = 'pending'").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "states": counts,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0.0
+        }
+
+    def close(self):
+        self._db.close()
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._db)
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, so a lease's read and write are atomic across processes"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+
+    def __enter__(self):
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+# Redis scripts keep each state change atomic across workers and machines
+LEASE_SCRIPT = """
+local now, expires, owner, prefix = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+local id = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, 1)[1]
+if id then
+    redis.call('ZREM', KEYS[2], id)
+else
+    id = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, 1)[1]
+    if not id then return nil end
+    redis.call('ZREM', KEYS[1], id)
+end
+redis.call('ZADD', KEYS[2], expires, id)
+local key = prefix .. 'job:' .. id
+local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+local not_before = redis.call('HGET', key, 'not_before') or ''
+redis.call('HSET', key, 'state', 'leased', 'lease_owner', owner)
+redis.call('HDEL', key, 'not_before')
+return {id, attempts, redis.call('HGET', key, 'url'), redis.call('HGET', key, 'batch_id'), not_before}
+"""
+
+FINISH_SCRIPT = """
+local key, owner, retention = KEYS[1], ARGV[1], tonumber(ARGV[8])
+if redis.call('HGET', key, 'state') ~= 'leased' or redis.call('HGET', key, 'lease_owner') ~= owner then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[2])
+redis.call('HSET', key, 'state', ARGV[3], 'error', ARGV[4], 'result', ARGV[5], 'lease_owner', '')
+if ARGV[3] == 'pending' then
+    redis.call('ZADD', KEYS[3], ARGV[6], ARGV[2])
+else
+    if ARGV[3] == 'done' then
+        redis.call('XADD', KEYS[4], 'MAXLEN', '~', 100000, '*', 'url', ARGV[7])
+    end
+    redis.call('EXPIRE', key, retention)
+    redis.call('EXPIRE', ARGV[9] .. 'batch:' .. redis.call('HGET', key, 'batch_id'), retention)
+end
+return 1
+"""
+
+RESERVE_SCRIPT = """
+local now, delay = tonumber(ARGV[1]), tonumber(ARGV[2])
+local start = math.max(now, tonumber(redis.call('GET', KEYS[1]) or '0'))
+redis.call('SET', KEYS[1], tostring(start + delay), 'EX', math.ceil(start - now + delay) + 60)
+return tostring(start)
+"""
+
+RELEASE_SCRIPT = """
+local key, owner = KEYS[1], ARGV[1]
+if redis.call('HGET', key, 'state') ~= 'leased' or redis.call('HGET', key, 'lease_owner') ~= owner then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[2])
+redis.call('HINCRBY', key, 'attempts', -1)
+redis.call('HSET', key, 'state', 'pending', 'lease_owner', '', 'not_before', ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[2])
+return 1
+"""
+
+class RedisJobQueue:
+    """The SQLiteJobQueue contract on Redis, for workers on several machines.
+
+    Jobs are hashes; ready jobs sit in a sorted set scored by availability
+    time and leased jobs in one scored by lease expiry. Completions go to a
+    capped stream whose entry ids are the follower cursor, and stage events
+    to one stream per batch. Finished jobs and batches expire after
+    `retention` seconds.
+    """
+
+    def __init__(self, url: str, prefix: str = "scraper:", max_attempts: int = 3, retry_delay: float = 30.0,
+                 retention: float = 7 * 24 * 3600):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The Redis job queue requires redis (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self._lease = self.client.register_script(LEASE_SCRIPT)
+        self._finish = self.client.register_script(FINISH_SCRIPT)
+        self._reserve = self.client.register_script(RESERVE_SCRIPT)
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return self.prefix + name
+
+    def enqueue(self, urls: List[str], batch_id: Optional[str] = None) -> str:
+        batch_id = batch_id or uuid.uuid4().hex
+        now = time.time()
+        first = self.client.incrby(self._key("next_id"), len(urls)) - len(urls) + 1
+        pipe = self.client.pipeline()
+        for offset, url in enumerate(urls):
+            job_id = str(first + offset)
+            pipe.hset(self._key("job:" + job_id), mapping={
+                "batch_id": batch_id, "url": url, "state": "pending", "attempts": 0, "created_at": now
+            })
+            pipe.zadd(self._key("ready"), {job_id: now})
+            pipe.rpush(self._key("batch:" + batch_id), job_id)
+        pipe.execute()
+        return batch_id
+
+    def lease(self, owner: str, visibility_timeout: float) -> Optional[Dict]:
+        while True:
+            now = time.time()
+            leased = self._lease(
+                keys=[self._key("ready"), self._key("leased")],
+                args=[now, now + visibility_timeout, owner, self.prefix]
+            )
+            if leased is None:
+                return None
+            job_id, attempts, url, batch_id, not_before = leased
+            job = {
+                "id": job_id, "batch_id": batch_id, "url": url, "attempts": int(attempts), "owner": owner,
+                "not_before": float(not_before) if not_before else None
+            }
+            if job["attempts"] > self.max_attempts:
+                self._finish_job(job, "failed", "lease expired")
+                continue
+            return job
+
+    def extend(self, job: Dict, visibility_timeout: float) -> bool:
+        key = self._key("job:" + job["id"])
+        if self.client.hget(key, "lease_owner") != job["owner"]:
+            return False
+        self.client.zadd(self._key("leased"), {job["id"]: time.time() + visibility_timeout}, xx=True)
+        return True
+
+    def complete(self, job: Dict, result: Dict) -> bool:
+        return self._finish_job(job, "done", "", json.dumps(result, default=str), url=result.get("url") or job["url"])
+
+    def fail(self, job: Dict, error: str, retry: bool = True) -> str:
+        state = "failed" if not retry or job["attempts"] >= self.max_attempts else "pending"
+        retry_at = time.time() + self.retry_delay * 2 ** (job["attempts"] - 1)
+        self._finish_job(job, state, error, retry_at=retry_at)
+        return state
+
+    def _finish_job(self, job: Dict, state: str, error: str, result: str = "", retry_at: float = 0.0,
+                    url: str = "") -> bool:
+        return bool(self._finish(
+            keys=[self._key("job:" + job["id"]), self._key("leased"), self._key("ready"), self._key("completed")],
+            args=[job["owner"], job["id"], state, error, result, retry_at, url, int(self.retention), self.prefix]
+        ))
+
+    def release(self, job: Dict, not_before: float) -> bool:
+        return bool(self._release(
+            keys=[self._key("job:" + job["id"]), self._key("leased"), self._key("ready")],
+            args=[job["owner"], job["id"], not_before]
+        ))
+
+    def reserve_domain(self, domain: str, delay: float) -> float:
+        return float(self._reserve(keys=[self._key("domain:" + domain)], args=[time.time(), delay]))
+
+    def publish(self, job: Dict, event: Dict):
+        key = self._key("events:" + job["batch_id"])
+        pipe = self.client.pipeline()
+        pipe.xadd(key, {"event": json.dumps(event, default=str)}, maxlen=100000, approximate=True)
+        pipe.expire(key, int(self.retention))
+        pipe.execute()
+
+    def events_since(self, batch_id: str, cursor: str = "0", limit: int = 500) -> Tuple[str, List[Dict]]:
+        start = "-" if cursor == "0" else "(" + cursor
+        entries = self.client.xrange(self._key("events:" + batch_id), min=start, max="+", count=limit)
+        if not entries:
+            return cursor, []
+        return entries[-1][0], [json.loads(fields["event"]) for _, fields in entries]
+
+    def prune(self) -> int:
+        """Trim completions older than the retention; job hashes expire on their own"""
+        cutoff_ms = int((time.time() - self.retention) * 1000)
+        return self.client.xtrim(self._key("completed"), minid=cutoff_ms)
+
+    def batch_status(self, batch_id: str) -> List[Dict]:
+        job_ids = self.client.lrange(self._key("batch:" + batch_id), 0, -1)
+        pipe = self.client.pipeline()
+        for job_id in job_ids:
+            pipe.hgetall(self._key("job:" + job_id))
+        return [
+            {
+                "id": job_id, "url": job["url"], "state": job["state"], "attempts": int(job["attempts"]),
+                "error": job.get("error") or None,
+                "result": json.loads(job["result"]) if job.get("result") else None
+            }
+            for job_id, job in zip(job_ids, pipe.execute())
+        ]
+
+    def completed_since(self, cursor: str = "0", limit: int = 500) -> Tuple[str, List[str]]:
+        start = "-" if cursor == "0" else "(" + cursor
+        entries = self.client.xrange(self._key("completed"), min=start, max="+", count=limit)
+        if not entries:
+            return cursor, []
+        return entries[-1][0], [fields["url"] for _, fields in entries]
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "redis",
+            "states": {
+                "pending": self.client.zcard(self._key("ready")),
+                "leased": self.client.zcard(self._key("leased"))
+            },
+            "completions_logged": self.client.xlen(self._key("completed"))
+        }
+
+    def close(self):
+        self.client.close()
+
+def open_queue(url: str = "sqlite:///data/jobs.db", **options):
+    """Open a job queue from a URL: sqlite:///<path> or redis://host:port/db"""
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):], **options)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobQueue(url, **options)
+    raise ValueError(f"Unknown job queue URL: {url}")
@@ -0,0 +1,160 @@
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import os
+import signal
+import socket
+import time
+from crawler.robots import robots_path
+from scraper.html_loader import HTMLLoader
+
+class Worker:
+    """One worker process: a browser shared by `concurrency` job slots.
+
+    Each slot leases a job, runs the orchestrator pipeline with the shared
+    browser, and extends its lease while the page is processed. The
+    in-process search indexes belong to the API; workers only write to
+    MongoDB and the graph ingest queue. Pages are stored with durable=False
+    and their writes awaited before the job completes, so concurrent slots
+    share MongoDB bulk writes. Stage events are published to the
+    queue so the API can relay them, and finished jobs are pruned every
+    prune_interval seconds.
+
+    Politeness is enforced when a job is leased: URLs disallowed by
+    robots.txt fail without retries, and fetches of one domain are spaced
+    by its Crawl-delay (at least min_delay) across all worker processes.
+    A job whose slot is more than max_wait away goes back to the queue
+    until then.
+    """
+
+    def __init__(self, queue, concurrency: int = 4, visibility_timeout: float = 300.0,
+                 poll_interval: float = 1.0, prune_interval: float = 3600.0,
+                 min_delay: float = 0.0, max_wait: float = 5.0):
+        self.queue = queue
+        self.min_delay = min_delay
+        self.max_wait = max_wait
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.prune_interval = prune_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.orchestrator = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    async def run(self):
+        """Process jobs until SIGINT/SIGTERM, then let running jobs finish"""
+        from main import WebScrapingOrchestrator
+
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        self.orchestrator = WebScrapingOrchestrator(local_indexes=False)
+        await self.orchestrator.startup()
+        print(f"✓ Worker {self.name} started with {self.concurrency} slots")
+        try:
+            async with HTMLLoader() as loader:
+                self.orchestrator.html_loader = loader
+                await asyncio.gather(self._prune(), *(self._slot(slot) for slot in range(self.concurrency)))
+        finally:
+            self.orchestrator.html_loader = None
+            await self.orchestrator.close_connections()
+            print(f"✓ Worker {self.name} stopped")
+
+    async def _slot(self, slot: int):
+        owner = f"{self.name}/{slot}"
+        while not self._stopping.is_set():
+            try:
+                job = await asyncio.to_thread(self.queue.lease, owner, self.visibility_timeout)
+            except Exception as e:
+                print(f"✗ Could not lease a job: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _process(self, job: Dict):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        result = {}
+        try:
+            # Inside the try: a queue or robots error fails this job (with retries), not the worker
+            if not await self._polite(job):
+                return
+            async for event in self.orchestrator.process_url_stages(job["url"], durable=False):
+                # done/error reach followers as the job's final state instead
+                if event["stage"] in ("done", "error"):
+                    result = event["data"]
+                else:
+                    await asyncio.to_thread(self.queue.publish, job, event)
+            if "pending_write" in result:
+                result = await self.orchestrator.complete_write(result)
+        except Exception as e:
+            result = {"error": str(e)}
+        finally:
+            heartbeat.cancel()
+
+        try:
+            if "error" in result:
+                state = await asyncio.to_thread(self.queue.fail, job, result["error"])
+                print(f"✗ Job {job['id']} ({job['url']}) failed, now {state}: {result['error']}")
+            else:
+                await asyncio.to_thread(self.queue.complete, job, {
+                    "url": result["url"],
+                    "title": result.get("title"),
+                    "mongo_id": result.get("mongo_id"),
+                    "duplicate_of": result.get("duplicate_of")
+                })
+        except Exception as e:
+            # The lease runs out and the job is leased again
+            print(f"✗ Could not record job {job['id']} ({job['url']}): {str(e)}")
+
+    async def _polite(self, job: Dict) -> bool:
+        """Check robots.txt and wait for the domain's crawl slot; False if the job was handed back"""
+        url = job["url"]
+        if not self.orchestrator.respect_robots:
+            return True
+        rules = await self.orchestrator.robots_rules(url)
+        if not rules.allowed(robots_path(url)):
+            await asyncio.to_thread(self.queue.fail, job, "Disallowed by robots.txt", False)
+            print(f"✗ Job {job['id']} ({url}) disallowed by robots.txt")
+            return False
+
+        delay = max(rules.crawl_delay or 0.0, self.min_delay)
+        if delay <= 0 or job.get("not_before"):
+            # No pacing needed, or this job was released into a slot it already holds
+            return True
+        start = await asyncio.to_thread(self.queue.reserve_domain, urlsplit(url).netloc, delay)
+        wait = start - time.time()
+        if wait > self.max_wait:
+            await asyncio.to_thread(self.queue.release, job, start)
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    async def _prune(self):
+        """Drop old finished jobs, completions and events until stopped"""
+        while not self._stopping.is_set():
+            try:
+                deleted = await asyncio.to_thread(self.queue.prune)
+                if deleted:
+                    print(f"✓ Pruned {deleted} finished job records")
+            except Exception as e:
+                print(f"✗ Job queue pruning failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.prune_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job: Dict):
+        """Keep the lease alive while the job runs"""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend, job, self.visibility_timeout):
+                print(f"✗ Lost lease on job {job['id']} ({job['url']})")
+                return